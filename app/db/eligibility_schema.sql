@@ -0,0 +1,25 @@
+-- Derived from product_eligibility by init_db.update_eligibility_state(); never written directly.
+
+-- One row per run of identical (eligibility, message) snapshots for an item.
+-- The status holds from valid_from (inclusive) to valid_to (exclusive);
+-- the current interval of each item has valid_to = '9999-12-31 23:59:59'.
+CREATE TABLE IF NOT EXISTS eligibility_intervals (
+    item_id INTEGER,
+    valid_from TEXT,
+    valid_to TEXT,
+    eligibility BOOLEAN,
+    message TEXT
+);
+
+-- Most recent snapshot per item.
+CREATE TABLE IF NOT EXISTS eligibility_latest (
+    item_id INTEGER PRIMARY KEY,
+    eligibility_datetime_utc TEXT,
+    eligibility BOOLEAN,
+    message TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_product_eligibility_item_time ON product_eligibility (item_id, eligibility_datetime_utc);
+CREATE INDEX IF NOT EXISTS idx_eligibility_intervals_item ON eligibility_intervals (item_id, valid_from);
+CREATE INDEX IF NOT EXISTS idx_eligibility_intervals_period ON eligibility_intervals (valid_from, valid_to);
+CREATE INDEX IF NOT EXISTS idx_eligibility_latest_status ON eligibility_latest (eligibility);
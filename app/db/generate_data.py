@@ -0,0 +1,200 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from init_db import SCHEMA_FILE_PATH, ELIGIBILITY_SCHEMA_FILE_PATH, update_eligibility_state
+
+# Reasons seen in the bundled eligibility.csv, with their observed frequencies.
+INELIGIBLE_MESSAGES = [
+    "This product's cost to Amazon does not allow us to meet customers’ pricing expectations. Consider reducing the cost. It may take a few weeks for your product to become eligible to advertise after you reduce the cost.",
+    "This product is either missing important information or contains incorrect information. Review in your product inventory.",
+]
+INELIGIBLE_MESSAGE_WEIGHTS = [0.9, 0.1]
+
+# --- Distribution parameters fitted to the bundled CSVs in app/data/ ---
+NEVER_ADVERTISED_SHARE = 0.44   # Items with no ad impressions at all
+ELIGIBLE_SHARE = 0.85           # Share of eligibility snapshots that are eligible
+ELIGIBILITY_FLIP_PROB = 0.002   # Daily chance an item's eligibility status changes
+RETURN_PROB = 0.025             # Share of total sales rows that are net returns (negative)
+ELIGIBILITY_TIME = "08:50:07"   # Daily eligibility snapshot time (UTC)
+
+
+def make_item_profiles(rng, n_items):
+    """Per-item parameters; every daily row for an item is drawn from its profile."""
+    advertised = rng.random(n_items) >= NEVER_ADVERTISED_SHARE
+    return {
+        "ad_active_prob": np.where(advertised, rng.beta(1.5, 1.2, n_items), 0.0),
+        "log_impressions_mu": rng.normal(5.0, 2.0, n_items),
+        "ctr": np.clip(rng.lognormal(np.log(0.0056), 0.6, n_items), 0.0, 0.2),
+        "cpc": rng.lognormal(np.log(1.49), 0.4, n_items),
+        "conversion": rng.beta(1.2, 6.0, n_items),
+        "price": np.clip(rng.lognormal(np.log(150.0), 0.4, n_items), 20.0, 1000.0),
+        "has_total_sales": advertised | (rng.random(n_items) < 0.35),
+        "total_sales_prob": rng.beta(2.0, 1.5, n_items),
+        "organic_units_mu": rng.lognormal(np.log(3.0), 1.0, n_items),
+        "eligible": rng.random(n_items) < ELIGIBLE_SHARE,
+        "message_idx": rng.choice(len(INELIGIBLE_MESSAGES), n_items, p=INELIGIBLE_MESSAGE_WEIGHTS),
+    }
+
+
+def generate_day(rng, profiles, day):
+    """Generates one day of ad_sales_metrics, total_sales_metrics and product_eligibility rows for all items."""
+    n_items = len(profiles["price"])
+    item_ids = np.arange(n_items)
+    date_str = day.strftime("%Y-%m-%d")
+
+    # --- ad_sales_metrics: one row per item per day, mostly zeros ---
+    active = rng.random(n_items) < profiles["ad_active_prob"]
+    impressions = np.where(
+        active,
+        np.maximum(1, np.rint(np.exp(rng.normal(profiles["log_impressions_mu"], 1.5)))),
+        0,
+    ).astype(np.int64)
+    impressions = np.minimum(impressions, 5_000_000)
+    clicks = rng.binomial(impressions, profiles["ctr"])
+    ad_spend = np.round(clicks * profiles["cpc"] * rng.lognormal(0.0, 0.1, n_items), 2)
+    units_sold = rng.binomial(clicks, profiles["conversion"])
+    ad_sales = np.round(units_sold * profiles["price"], 2)
+    df_ad = pd.DataFrame({
+        "date": date_str,
+        "item_id": item_ids,
+        "ad_sales": ad_sales,
+        "impressions": impressions,
+        "ad_spend": ad_spend,
+        "clicks": clicks,
+        "units_sold": units_sold,
+    })
+
+    # --- total_sales_metrics: only items that sold (or returned) something that day ---
+    present = profiles["has_total_sales"] & (rng.random(n_items) < profiles["total_sales_prob"])
+    organic = rng.poisson(profiles["organic_units_mu"])
+    total_units = units_sold + organic
+    returns = rng.random(n_items) < RETURN_PROB
+    total_units = np.where(returns, -(rng.poisson(1.0, n_items) + 1), total_units)
+    total_sales = np.round(total_units * profiles["price"], 2)
+    df_total = pd.DataFrame({
+        "date": date_str,
+        "item_id": item_ids[present],
+        "total_sales": total_sales[present],
+        "total_units_ordered": total_units[present],
+    })
+
+    # --- product_eligibility: one snapshot per item per day; status is sticky ---
+    flips = rng.random(n_items) < ELIGIBILITY_FLIP_PROB
+    profiles["eligible"] = np.where(flips, ~profiles["eligible"], profiles["eligible"])
+    messages = np.array(INELIGIBLE_MESSAGES, dtype=object)[profiles["message_idx"]]
+    df_elig = pd.DataFrame({
+        "eligibility_datetime_utc": f"{date_str} {ELIGIBILITY_TIME}",
+        "item_id": item_ids,
+        "eligibility": profiles["eligible"].astype(int),
+        "message": np.where(profiles["eligible"], None, messages),
+    })
+
+    return df_ad, df_total, df_elig
+
+
+def iter_days(n_items, n_days, start_date, seed):
+    """Yields (day, df_ad, df_total, df_elig) one day at a time so memory stays bounded at any scale."""
+    rng = np.random.default_rng(seed)
+    profiles = make_item_profiles(rng, n_items)
+    for day in pd.date_range(start_date, periods=n_days, freq="D"):
+        yield (day,) + generate_day(rng, profiles, day)
+
+
+def write_csvs(output_dir, n_items, n_days, start_date, seed):
+    """Writes eligibility.csv, ad_sales.csv and total_sales.csv in the layout init_db.load_data() expects."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "ad": os.path.join(output_dir, "ad_sales.csv"),
+        "total": os.path.join(output_dir, "total_sales.csv"),
+        "elig": os.path.join(output_dir, "eligibility.csv"),
+    }
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+    counts = {"ad": 0, "total": 0, "elig": 0}
+    for _, df_ad, df_total, df_elig in iter_days(n_items, n_days, start_date, seed):
+        df_elig = df_elig.assign(eligibility=df_elig["eligibility"].map({1: "TRUE", 0: "FALSE"}))
+        for key, df in (("ad", df_ad), ("total", df_total), ("elig", df_elig)):
+            df.to_csv(paths[key], mode="a", header=not os.path.exists(paths[key]), index=False)
+            counts[key] += len(df)
+    return counts
+
+
+def write_sqlite(db_file, n_items, n_days, start_date, seed, batch_rows=200_000):
+    """Creates a fresh database from schema.sql and bulk-inserts the generated rows."""
+    conn = sqlite3.connect(db_file)
+    # Bulk-load settings: the file is rebuilt from scratch, so durability during the load does not matter.
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+    with open(SCHEMA_FILE_PATH, "r") as f:
+        conn.executescript(f.read())
+    with open(ELIGIBILITY_SCHEMA_FILE_PATH, "r") as f:
+        conn.executescript(f.read())
+
+    inserts = {
+        "ad": ("INSERT INTO ad_sales_metrics (date, item_id, ad_sales, impressions, ad_spend, clicks, units_sold) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)"),
+        "total": "INSERT INTO total_sales_metrics (date, item_id, total_sales, total_units_ordered) VALUES (?, ?, ?, ?)",
+        "elig": ("INSERT INTO product_eligibility (eligibility_datetime_utc, item_id, eligibility, message) "
+                 "VALUES (?, ?, ?, ?)"),
+    }
+    buffers = {"ad": [], "total": [], "elig": []}
+    counts = {"ad": 0, "total": 0, "elig": 0}
+
+    def flush(key):
+        if buffers[key]:
+            conn.executemany(inserts[key], buffers[key])
+            counts[key] += len(buffers[key])
+            if key == "elig":
+                # Extend the derived eligibility intervals with just this batch
+                new_rows = pd.DataFrame(buffers[key], columns=["eligibility_datetime_utc", "item_id", "eligibility", "message"])
+                update_eligibility_state(conn, new_rows)
+            buffers[key] = []
+
+    conn.execute("BEGIN")
+    for _, df_ad, df_total, df_elig in iter_days(n_items, n_days, start_date, seed):
+        for key, df in (("ad", df_ad), ("total", df_total), ("elig", df_elig)):
+            # Series.tolist() yields native Python types that sqlite3 can bind directly
+            buffers[key].extend(zip(*(df[col].tolist() for col in df.columns)))
+            if len(buffers[key]) >= batch_rows:
+                flush(key)
+    for key in buffers:
+        flush(key)
+    conn.commit()
+    conn.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic e-commerce data shaped like app/data/*.csv.")
+    parser.add_argument("--items", type=int, default=10_000, help="Number of distinct item_ids")
+    parser.add_argument("--days", type=int, default=90, help="Number of consecutive days")
+    parser.add_argument("--start-date", default="2025-06-01", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; same seed + sizes gives identical data")
+    parser.add_argument("--format", choices=["sqlite", "csv"], default="sqlite",
+                        help="'sqlite' writes a database directly, 'csv' writes a data dir for init_db.load_data()")
+    parser.add_argument("--output", default="ecom_synthetic.db", help="SQLite file or CSV output directory")
+    args = parser.parse_args()
+
+    print(f"--- Generating {args.items} items x {args.days} days (seed {args.seed}) as {args.format} ---")
+    start = time.perf_counter()
+    if args.format == "sqlite":
+        if os.path.exists(args.output):
+            os.remove(args.output)
+            print(f"🗑️ Existing '{args.output}' removed.")
+        counts = write_sqlite(args.output, args.items, args.days, args.start_date, args.seed)
+    else:
+        counts = write_csvs(args.output, args.items, args.days, args.start_date, args.seed)
+    elapsed = time.perf_counter() - start
+
+    total_rows = sum(counts.values())
+    print(f"✅ Wrote {counts['ad']} ad_sales_metrics, {counts['total']} total_sales_metrics and "
+          f"{counts['elig']} product_eligibility rows to '{args.output}' "
+          f"in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s).")
@@ -4,12 +4,120 @@ import os
 
 # --- UPDATED PATHS ---
 SCHEMA_FILE_PATH = "app/db/schema.sql" # Path relative to project root
+ELIGIBILITY_SCHEMA_FILE_PATH = "app/db/eligibility_schema.sql" # Derived eligibility tables
 DATA_DIR_PATH = "app/data"             # Path relative to project root
 # --- END UPDATED PATHS ---
 
-def load_data():
+# valid_to of the current (still open) eligibility interval of an item
+OPEN_INTERVAL_END = "9999-12-31 23:59:59"
+
+
+def _nullable(series):
+    # NaN -> None so sqlite3 stores NULL
+    series = series.astype(object)
+    return series.where(series.notna(), None).tolist()
+
+
+def ensure_eligibility_state(conn):
+    """Creates the derived eligibility tables if missing and builds them from the log if they are empty."""
+    with open(ELIGIBILITY_SCHEMA_FILE_PATH, "r") as f:
+        conn.executescript(f.read())
+    has_intervals = conn.execute("SELECT 1 FROM eligibility_intervals LIMIT 1").fetchone()
+    has_log = conn.execute("SELECT 1 FROM product_eligibility LIMIT 1").fetchone()
+    if has_log and not has_intervals:
+        update_eligibility_state(conn)
+        conn.commit()
+        print("✅ Eligibility intervals built from product_eligibility.")
+
+
+def update_eligibility_state(conn, new_rows=None):
+    """
+    Folds product_eligibility rows into eligibility_intervals and eligibility_latest.
+
+    'new_rows' is a DataFrame of rows that were just appended to product_eligibility
+    (only item_id and eligibility_datetime_utc are used); None rebuilds every item.
+    Rows that arrive in time order only extend each item's open interval; an item
+    that receives a row older than its open interval is rebuilt from its full log.
+    Returns the number of items updated. The caller commits.
+    """
+    if new_rows is None:
+        cutoffs = pd.read_sql_query(
+            "SELECT item_id, MIN(eligibility_datetime_utc) AS cutoff FROM product_eligibility GROUP BY item_id", conn)
+    else:
+        # Earliest new snapshot per item (sort + dedupe is much faster than groupby().min() on strings)
+        cutoffs = (new_rows[["item_id", "eligibility_datetime_utc"]]
+                   .sort_values(["item_id", "eligibility_datetime_utc"])
+                   .drop_duplicates("item_id")
+                   .rename(columns={"eligibility_datetime_utc": "cutoff"}))
+    if cutoffs.empty:
+        return 0
+
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS temp.eligibility_cutoffs")
+    cursor.execute("CREATE TEMP TABLE eligibility_cutoffs (item_id INTEGER PRIMARY KEY, cutoff TEXT, full_rebuild INTEGER DEFAULT 0)")
+    cursor.executemany("INSERT INTO eligibility_cutoffs (item_id, cutoff) VALUES (?, ?)",
+                       zip(cutoffs["item_id"].tolist(), cutoffs["cutoff"].tolist()))
+
+    # Out-of-order rows: the item already has an interval starting at/after the new row, or a closed one spanning it.
+    cursor.execute("""
+        UPDATE eligibility_cutoffs SET full_rebuild = 1 WHERE EXISTS (
+            SELECT 1 FROM eligibility_intervals i
+            WHERE i.item_id = eligibility_cutoffs.item_id
+              AND (i.valid_from >= eligibility_cutoffs.cutoff
+                   OR (i.valid_to <> ? AND i.valid_to > eligibility_cutoffs.cutoff)))
+    """, (OPEN_INTERVAL_END,))
+
+    # In-order items continue from their open interval, which is re-emitted as the first snapshot.
+    seeds = pd.read_sql_query("""
+        SELECT i.item_id, i.valid_from AS eligibility_datetime_utc, i.eligibility, i.message
+        FROM eligibility_cutoffs c CROSS JOIN eligibility_intervals i ON i.item_id = c.item_id
+        WHERE c.full_rebuild = 0 AND i.valid_to = ?
+    """, conn, params=(OPEN_INTERVAL_END,))
+    cursor.execute("""
+        DELETE FROM eligibility_intervals
+        WHERE item_id IN (SELECT item_id FROM eligibility_cutoffs WHERE full_rebuild = 1)
+           OR (valid_to = ? AND item_id IN (SELECT item_id FROM eligibility_cutoffs))
+    """, (OPEN_INTERVAL_END,))
+
+    # CROSS JOIN pins the small cutoffs table as the outer loop, so the log is only read through its index.
+    snapshots = pd.read_sql_query("""
+        SELECT p.item_id, p.eligibility_datetime_utc, p.eligibility, p.message
+        FROM eligibility_cutoffs c CROSS JOIN product_eligibility p ON p.item_id = c.item_id
+        WHERE c.full_rebuild = 0 AND p.eligibility_datetime_utc >= c.cutoff
+        UNION ALL
+        SELECT p.item_id, p.eligibility_datetime_utc, p.eligibility, p.message
+        FROM eligibility_cutoffs c CROSS JOIN product_eligibility p ON p.item_id = c.item_id
+        WHERE c.full_rebuild = 1
+    """, conn)
+    df = pd.concat([seeds, snapshots], ignore_index=True)
+    df = df.sort_values(["item_id", "eligibility_datetime_utc"], kind="mergesort").reset_index(drop=True)
+
+    # Run-length encode consecutive identical (eligibility, message) snapshots per item.
+    status = df["eligibility"].astype(int)
+    message_key = df["message"].fillna("")
+    new_run = ((df["item_id"] != df["item_id"].shift())
+               | (status != status.shift())
+               | (message_key != message_key.shift()))
+    runs = df[new_run].copy()
+    runs["valid_to"] = runs.groupby("item_id")["eligibility_datetime_utc"].shift(-1).fillna(OPEN_INTERVAL_END)
+    cursor.executemany(
+        "INSERT INTO eligibility_intervals (item_id, valid_from, valid_to, eligibility, message) VALUES (?, ?, ?, ?, ?)",
+        zip(runs["item_id"].tolist(), runs["eligibility_datetime_utc"].tolist(), runs["valid_to"].tolist(),
+            runs["eligibility"].astype(int).tolist(), _nullable(runs["message"])))
+
+    latest = df.groupby("item_id").tail(1)
+    cursor.executemany(
+        "INSERT OR REPLACE INTO eligibility_latest (item_id, eligibility_datetime_utc, eligibility, message) VALUES (?, ?, ?, ?)",
+        zip(latest["item_id"].tolist(), latest["eligibility_datetime_utc"].tolist(),
+            latest["eligibility"].astype(int).tolist(), _nullable(latest["message"])))
+
+    cursor.execute("DROP TABLE temp.eligibility_cutoffs")
+    return len(cutoffs)
+
+
+def load_data(db_file="ecom.db", data_dir=DATA_DIR_PATH):
     # Connect to SQLite DB (auto-creates if not exists)
-    conn = sqlite3.connect("ecom.db") # Still creates in project root
+    conn = sqlite3.connect(db_file) # Defaults to ecom.db in project root
     cursor = conn.cursor()
 
     # Execute schema
@@ -20,15 +128,17 @@ def load_data():
 
     with open(SCHEMA_FILE_PATH, "r") as f:
         cursor.executescript(f.read())
+    with open(ELIGIBILITY_SCHEMA_FILE_PATH, "r") as f:
+        cursor.executescript(f.read())
     print("✅ Database schema applied.")
 
     # Load CSVs
     try:
-        df_elig = pd.read_csv(os.path.join(DATA_DIR_PATH, "eligibility.csv"))
-        df_ad = pd.read_csv(os.path.join(DATA_DIR_PATH, "ad_sales.csv"))
-        df_total = pd.read_csv(os.path.join(DATA_DIR_PATH, "total_sales.csv"))
+        df_elig = pd.read_csv(os.path.join(data_dir, "eligibility.csv"))
+        df_ad = pd.read_csv(os.path.join(data_dir, "ad_sales.csv"))
+        df_total = pd.read_csv(os.path.join(data_dir, "total_sales.csv"))
     except FileNotFoundError as e:
-        print(f"❌ Error loading CSVs: {e}. Make sure '{DATA_DIR_PATH}' folder and CSVs exist.")
+        print(f"❌ Error loading CSVs: {e}. Make sure '{data_dir}' folder and CSVs exist.")
         conn.close()
         return False
 
@@ -45,14 +155,24 @@ def load_data():
     df_ad.to_sql("ad_sales_metrics", conn, if_exists="append", index=False)
     df_total.to_sql("total_sales_metrics", conn, if_exists="append", index=False)
 
+    # Maintain the derived current-state / interval tables for the rows just appended
+    update_eligibility_state(conn, df_elig)
+
     conn.commit()
     conn.close()
-    print("✅ Data loaded successfully into ecom.db")
+    print(f"✅ Data loaded successfully into {db_file}")
     return True
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="(Re)create a database from a data dir of CSVs.")
+    parser.add_argument("--db-file", default="ecom.db", help="e.g. tenants/<tenant_id>/ecom.db for a tenant")
+    parser.add_argument("--data-dir", default=DATA_DIR_PATH, help="e.g. tenants/<tenant_id>/data for a tenant")
+    args = parser.parse_args()
+
     # Remove existing DB to ensure fresh load and correct formatting
-    if os.path.exists("ecom.db"):
-        os.remove("ecom.db")
-        print("🗑️ Existing 'ecom.db' removed to ensure fresh data load.")
-    load_data()
\ No newline at end of file
+    if os.path.exists(args.db_file):
+        os.remove(args.db_file)
+        print(f"🗑️ Existing '{args.db_file}' removed to ensure fresh data load.")
+    os.makedirs(os.path.dirname(args.db_file) or ".", exist_ok=True)
+    load_data(args.db_file, args.data_dir)
\ No newline at end of file
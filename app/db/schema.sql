@@ -1,6 +1,8 @@
 DROP TABLE IF EXISTS product_eligibility;
 DROP TABLE IF EXISTS ad_sales_metrics;
 DROP TABLE IF EXISTS total_sales_metrics;
+DROP TABLE IF EXISTS eligibility_intervals;
+DROP TABLE IF EXISTS eligibility_latest;
 
 CREATE TABLE product_eligibility (
     eligibility_datetime_utc TEXT,
@@ -0,0 +1,217 @@
+# db/tenants.py
+
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from db.init_db import load_data, ensure_eligibility_state, DATA_DIR_PATH
+from utils.metrics import inc_counter
+
+# --- Configuration ---
+DEFAULT_TENANT_ID = os.getenv("DEFAULT_TENANT_ID", "default")
+DEFAULT_DB_FILE = "ecom.db"                        # The default tenant keeps the original single-tenant database
+TENANTS_DIR = os.getenv("TENANTS_DIR", "tenants")  # <TENANTS_DIR>/<tenant_id>/ecom.db, loaded from <TENANTS_DIR>/<tenant_id>/data/*.csv
+# Soft cap: once open handles exceed it, idle ones are closed least recently used first. Checked-out
+# handles are never closed early, so they are bounded by request threads + PREFETCH_WORKERS instead.
+MAX_OPEN_CONNECTIONS = int(os.getenv("TENANT_MAX_OPEN_CONNECTIONS", "256"))
+MAX_IDLE_PER_TENANT = int(os.getenv("TENANT_MAX_IDLE_PER_TENANT", "4"))
+IDLE_TIMEOUT_SECONDS = float(os.getenv("TENANT_IDLE_TIMEOUT_SECONDS", "300"))
+SWEEP_INTERVAL_SECONDS = min(IDLE_TIMEOUT_SECONDS / 2, 60) # Idle handles are also closed when no requests arrive
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Pooled handles outlive the request and run client/LLM-supplied SQL, so they are read-only and may
+# only read: ATTACH (also used by VACUUM INTO), PRAGMA assignments and writes are refused. Otherwise
+# an attached schema would leak into the next request, or a file could be created in another tenant's place.
+_ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE, sqlite3.SQLITE_TRANSACTION,
+}
+
+_idle = OrderedDict()   # tenant_id -> [(conn, last_used)], least recently used tenant first
+_open_count = 0         # Idle plus checked-out connections
+_pool_lock = threading.Lock()
+_sweeper = None         # Background thread running evict_idle_connections(), started on first checkout
+_ready = set()          # Tenants whose database was created/upgraded by this process
+_provision_lock = threading.Lock()
+
+
+def validate_tenant_id(tenant_id):
+    """Returns the tenant id to use (the default one if none was given). Raises ValueError for malformed ids."""
+    if not tenant_id:
+        return DEFAULT_TENANT_ID
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise ValueError("Invalid tenant id: use 1-64 letters, digits, '_' or '-'.")
+    return tenant_id
+
+
+def tenant_paths(tenant_id):
+    """Returns (db_file, data_dir) for a tenant."""
+    if tenant_id == DEFAULT_TENANT_ID:
+        return DEFAULT_DB_FILE, DATA_DIR_PATH
+    tenant_dir = os.path.join(TENANTS_DIR, tenant_id)
+    return os.path.join(tenant_dir, "ecom.db"), os.path.join(tenant_dir, "data")
+
+
+def ensure_tenant_database(tenant_id):
+    """
+    Creates the tenant's database from its data dir on first use (or adds the derived tables to an
+    existing one) and returns its path. Raises LookupError for tenants with neither a database nor data.
+    """
+    db_file, data_dir = tenant_paths(tenant_id)
+    if tenant_id in _ready:
+        return db_file
+
+    with _provision_lock:
+        if tenant_id in _ready:
+            return db_file
+        if not os.path.exists(db_file) or os.path.getsize(db_file) == 0:
+            if not os.path.isdir(data_dir):
+                raise LookupError(f"Unknown tenant '{tenant_id}': no database and no data dir at '{data_dir}'.")
+            print(f"--- Initializing database '{db_file}' for tenant '{tenant_id}' ---")
+            os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+            if not load_data(db_file, data_dir):
+                if os.path.exists(db_file):
+                    os.remove(db_file) # Don't leave a schema-only database that looks loaded
+                raise LookupError(f"Loading data for tenant '{tenant_id}' from '{data_dir}' failed.")
+        else:
+            print(f"✅ Database '{db_file}' for tenant '{tenant_id}' already exists. Skipping initial load.")
+            # Databases created before the derived eligibility tables existed get them built once here
+            conn = sqlite3.connect(db_file)
+            try:
+                ensure_eligibility_state(conn)
+            finally:
+                conn.close()
+        _ready.add(tenant_id)
+    return db_file
+
+
+# ==============================================================================
+# --- Connection pool: per-tenant idle handles in one bounded LRU ---
+# ==============================================================================
+
+def _evict_locked(now):
+    """Caller holds _pool_lock. Detaches idle-expired handles, then LRU ones while over the cap; returns them for closing."""
+    global _open_count
+    evicted = []
+    # Tenants are ordered by last release, so expired ones are at the front
+    while _idle:
+        tenant_id, conns = next(iter(_idle.items()))
+        if now - conns[-1][1] <= IDLE_TIMEOUT_SECONDS and _open_count - len(evicted) <= MAX_OPEN_CONNECTIONS:
+            break
+        evicted.extend(conn for conn, _ in conns)
+        del _idle[tenant_id]
+    _open_count -= len(evicted)
+    return evicted
+
+
+def _read_only_authorizer(action, arg1, arg2, db_name, trigger):
+    if action in _ALLOWED_ACTIONS:
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_PRAGMA and arg2 is None:
+        return sqlite3.SQLITE_OK # Reading a pragma, e.g. table_info(...)
+    if action == sqlite3.SQLITE_UPDATE and arg1 in ("sqlite_master", "sqlite_schema"):
+        return sqlite3.SQLITE_OK # Schema lookups of pragma table functions; mode=ro keeps it read-only
+    return sqlite3.SQLITE_DENY
+
+
+def _connect_read_only(db_file):
+    uri = pathlib.Path(db_file).resolve().as_uri() + "?mode=ro"
+    # Handles are reused across request threads, one thread at a time
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.set_authorizer(_read_only_authorizer)
+    return conn
+
+
+def _close_all(conns):
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    if conns:
+        inc_counter("ecom_tenant_connections_evicted_total", len(conns),
+                    help_text="Idle tenant database handles closed by the LRU / idle timeout.")
+
+
+def _acquire(tenant_id, db_file):
+    global _open_count
+    with _pool_lock:
+        _start_sweeper_locked()
+        conns = _idle.get(tenant_id)
+        if conns:
+            conn, _ = conns.pop()
+            if not conns:
+                del _idle[tenant_id]
+            return conn
+        _open_count += 1
+        evicted = _evict_locked(time.time())
+    _close_all(evicted)
+    try:
+        return _connect_read_only(db_file)
+    except sqlite3.Error:
+        with _pool_lock:
+            _open_count -= 1
+        raise
+
+
+def _release(tenant_id, conn):
+    global _open_count
+    now = time.time()
+    with _pool_lock:
+        conns = _idle.setdefault(tenant_id, [])
+        conns.append((conn, now))
+        _idle.move_to_end(tenant_id)
+        evicted = []
+        while len(conns) > MAX_IDLE_PER_TENANT:
+            evicted.append(conns.pop(0)[0])
+        _open_count -= len(evicted)
+        evicted.extend(_evict_locked(now))
+    _close_all(evicted)
+
+
+@contextmanager
+def tenant_connection(tenant_id):
+    """Checks out a pooled read-only SQLite connection to the tenant's database; it is returned to the pool afterwards."""
+    global _open_count
+    db_file = ensure_tenant_database(tenant_id)
+    conn = _acquire(tenant_id, db_file)
+    try:
+        yield conn
+    finally:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Don't hand a connection in an unknown state to the next request
+            with _pool_lock:
+                _open_count -= 1
+            conn.close()
+        else:
+            _release(tenant_id, conn)
+
+
+def evict_idle_connections():
+    """Closes handles idle for longer than IDLE_TIMEOUT_SECONDS. Runs every SWEEP_INTERVAL_SECONDS and on every checkout/return."""
+    with _pool_lock:
+        evicted = _evict_locked(time.time())
+    _close_all(evicted)
+
+
+def _sweep_forever():
+    while True:
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+        evict_idle_connections()
+
+
+def _start_sweeper_locked():
+    """Caller holds _pool_lock."""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = threading.Thread(target=_sweep_forever, name="tenant-pool-sweeper", daemon=True)
+        _sweeper.start()
@@ -2,13 +2,18 @@
 
 import re
 from models.gemini_models import SQL_GEN_MODEL, HUMANIZE_MODEL
-from llm.prompts.sql_generation_prompts import SQL_GEN_PROMPT 
+from llm.prompts.sql_generation_prompts import SQL_GEN_PROMPT, FOLLOWUP_CONTEXT_PROMPT
 from llm.prompts.humanization_prompts import HUMANIZE_PROMPT
+from utils.metrics import record_llm_error
 
 
-def question_to_sql(question):
+def question_to_sql(question, previous_question=None, previous_sql=None):
     
-    prompt = SQL_GEN_PROMPT.format(question=question)
+    # Follow-ups that cannot be answered from the previous result get the prior question/SQL as context
+    conversation_context = ""
+    if previous_sql:
+        conversation_context = FOLLOWUP_CONTEXT_PROMPT.format(previous_question=previous_question, previous_sql=previous_sql)
+    prompt = SQL_GEN_PROMPT.format(question=question, conversation_context=conversation_context)
 
     try:
         response = SQL_GEN_MODEL.generate_content(prompt)
@@ -44,6 +49,7 @@ def question_to_sql(question):
         return sql_query
 
     except Exception as e:
+        record_llm_error("sql_generation")
         return f"-- ERROR: Gemini API failed: {e}"
 
 # Function to humanize the answer using Gemini
@@ -60,7 +66,11 @@ def humanize_answer(question, sql, result_df):
 
     prompt = HUMANIZE_PROMPT.format(question=question, sql=sql, result_text=result_text)
 
-    response = HUMANIZE_MODEL.generate_content(prompt) # Using HUMANIZE_MODEL
+    try:
+        response = HUMANIZE_MODEL.generate_content(prompt) # Using HUMANIZE_MODEL
+    except Exception:
+        record_llm_error("humanization")
+        raise
     print(response)
     return response.text.strip()
     # response = "Working the best way we can .... SELECT item_id, SUM(ad_sales) AS total_ad_sales FROM ad_sales_metrics WHERE date = '2025-06-01' GROUP BY item_id ORDER BY total_ad_sales DESC LIMIT 10;SELECT item_id, SUM(ad_sales) AS total_ad_sales FROM ad_sales_metrics WHERE date = '2025-06-01' GROUP BY item_id ORDER BY total_ad_sales DESC LIMIT 10;"
@@ -26,6 +26,19 @@ Below are the tables and their fields, including data types and brief descriptio
     * `eligibility` BOOLEAN: TRUE if the product was eligible at that specific datetime, FALSE if not.
     * `message` TEXT: Explanatory message regarding the eligibility status (can be empty if eligible).
 
+4.  **eligibility_intervals**: Eligibility history per item as time intervals, derived from `product_eligibility`. Each row is a period during which the item's status did not change.
+    * `item_id` INTEGER: Unique numerical identifier for the product item.
+    * `valid_from` TEXT: Start of the period (inclusive), in 'YYYY-MM-DD HH:MM:SS' format.
+    * `valid_to` TEXT: End of the period (exclusive), in 'YYYY-MM-DD HH:MM:SS' format. The current period of every item has `valid_to = '9999-12-31 23:59:59'`.
+    * `eligibility` BOOLEAN: TRUE if the product was eligible during the period, FALSE if not.
+    * `message` TEXT: Explanatory message for the status during the period (can be empty if eligible).
+
+5.  **eligibility_latest**: The most recent eligibility status of each item (one row per item).
+    * `item_id` INTEGER: Unique numerical identifier for the product item (primary key).
+    * `eligibility_datetime_utc` TEXT: Timestamp of the latest eligibility record, in 'YYYY-MM-DD HH:MM:SS' format.
+    * `eligibility` BOOLEAN: TRUE if the product is currently eligible, FALSE if not.
+    * `message` TEXT: Explanatory message for the current status (can be empty if eligible).
+
 **Guidelines for SQL Generation:**
 
 * **CRITICAL OUTPUT FORMAT**:
@@ -38,6 +51,10 @@ Below are the tables and their fields, including data types and brief descriptio
     * For `date` columns (YYYY-MM-DD format), use direct string comparison (e.g., `date = '2025-06-01'`).
     * For `eligibility_datetime_utc` (which stores 'YYYY-MM-DD HH:MM:SS' format), always extract the date part using `STRFTIME('%Y-%m-%d', eligibility_datetime_utc)` for date-only comparisons (e.g., `STRFTIME('%Y-%m-%d', eligibility_datetime_utc) = '2025-06-04'`).
     * For current date, use `DATE('now')`.
+* Eligibility Questions:
+    * For the current status of products ("currently", "now", "latest"), query `eligibility_latest`.
+    * For the status at a specific point in time, query `eligibility_intervals` with `valid_from <= 'YYYY-MM-DD HH:MM:SS' AND valid_to > 'YYYY-MM-DD HH:MM:SS'`. For a whole date, use the status at the end of that day ('YYYY-MM-DD 23:59:59').
+    * Use `product_eligibility` only when the individual eligibility records themselves are asked for.
 * Boolean Values: Use `TRUE` and `FALSE` for boolean comparisons in the `eligibility` column.
 * Aggregation: Use standard SQLite aggregate functions (e.g., SUM(), AVG(), COUNT(), MAX(), MIN()) where appropriate for summarized data.
 * Error Handling: If a question cannot be answered unambiguously or completely with the provided schema, output exactly: `ERROR: Query cannot be generated based on available data.`
@@ -68,7 +85,23 @@ SQL: SELECT item_id FROM ad_sales_metrics WHERE date = '2025-06-01' ORDER BY ad_
 Question: How many products were eligible on June 4, 2025?
 SQL: SELECT COUNT(DISTINCT item_id) FROM product_eligibility WHERE eligibility = TRUE AND STRFTIME('%Y-%m-%d', eligibility_datetime_utc) = '2025-06-04';
 
----
+Question: Which products are currently ineligible, and why?
+SQL: SELECT item_id, message FROM eligibility_latest WHERE eligibility = FALSE;
+
+Question: Was item 29 eligible on 2025-06-05?
+SQL: SELECT eligibility, message FROM eligibility_intervals WHERE item_id = 29 AND valid_from <= '2025-06-05 23:59:59' AND valid_to > '2025-06-05 23:59:59';
 
+---
+{conversation_context}
 Question: {question}
-SQL:"""
\ No newline at end of file
+SQL:"""
+
+# Filled into {conversation_context} when the session has a previous question (see question_to_sql).
+FOLLOWUP_CONTEXT_PROMPT = """
+**Conversation Context:**
+The user previously asked the question below, answered with the SQL below. If the new question refines it
+(e.g. adds a filter, a different date or a different metric for the same items), build on the previous SQL.
+If it is unrelated, ignore this context.
+Previous question: {previous_question}
+Previous SQL: {previous_sql}
+"""
\ No newline at end of file
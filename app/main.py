@@ -1,15 +1,22 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, Response
 import sqlite3
 import pandas as pd
 import os
+import time
 from plotly.utils import PlotlyJSONEncoder
 import google.generativeai as genai
 from dotenv import load_dotenv
 
 # --- UPDATED IMPORTS ---
 from llm.gemini_agent import question_to_sql, humanize_answer 
-from db.init_db import load_data as load_initial_data 
+from db.tenants import DEFAULT_TENANT_ID, validate_tenant_id, ensure_tenant_database, tenant_connection
 from utils.charts import generate_chart
+from utils.metrics import stage_timer, record_rows_returned, record_response, render_prometheus, record_cache_hit
+from utils.kpis import get_kpis
+from utils.profiling import profiling_requested, start_profile, stop_profile, finish_profile, discard_profile
+from utils.conversation import get_context, save_context, answer_followup, plan_followup, set_pending_result, pop_pending_result
+from utils.prefetch import schedule_prefetch, take_prefetched_sql, pop_prefetched_rows
+from utils.result_formats import negotiate_format, format_unavailable_reason, rows_payload, file_response
 # --- END UPDATED IMPORTS ---
 
 # --- Flask app instance ---
@@ -22,16 +29,14 @@ app.json_encoder = PlotlyJSONEncoder
 
 
 # --- Configuration ---
-DB_FILE = "ecom.db" # This path is relative to where Flask is run, usually project root
+# Each tenant has its own SQLite file (see db/tenants.py); requests pick one with the
+# 'X-Tenant-Id' header or a 'tenant_id' parameter, and the default tenant uses ecom.db.
+# Attach per-stage 'timings' to every /api/ask response (clients can also opt in per request)
+ATTACH_TIMINGS = os.getenv("ATTACH_TIMINGS", "false").lower() == "true"
 
-# --- Initial Database Load on App Startup ---
+# --- Initial Database Load on App Startup (other tenants are loaded on their first request) ---
 with app.app_context():
-    if not os.path.exists(DB_FILE) or os.path.getsize(DB_FILE) == 0:
-        print(f"--- Initializing database and loading data for web app ---")
-        load_initial_data() 
-        print(f"✅ Database '{DB_FILE}' initialized and loaded for web app.")
-    else:
-        print(f"✅ Database '{DB_FILE}' already exists and contains data. Skipping initial load for web app.")
+    ensure_tenant_database(DEFAULT_TENANT_ID)
 
 # Load Gemini API Key
 load_dotenv()
@@ -55,11 +60,10 @@ if GEMINI_API_KEY:
 
 
 # Helper function to run SQL queries, returning DataFrame or error info
-def run_sql_query_helper(query):
-    conn = None
+def run_sql_query_helper(query, tenant_id=DEFAULT_TENANT_ID):
     try:
-        conn = sqlite3.connect(DB_FILE)
-        df = pd.read_sql_query(query, conn)
+        with tenant_connection(tenant_id) as conn:
+            df = pd.read_sql_query(query, conn)
         return {"success": True, "data_frame": df}
     except pd.io.sql.DatabaseError as e:
         return {"error": f"Database query error: {str(e)}"}
@@ -67,9 +71,69 @@ def run_sql_query_helper(query):
         return {"error": f"SQLite error: {str(e)}"}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
-    finally:
-        if conn:
-            conn.close()
+
+# --- Request instrumentation: latency and response size for every endpoint ---
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get("request_start")
+    if start is not None and request.endpoint != "metrics":
+        size = None if response.is_streamed else response.calculate_content_length()
+        record_response(request.endpoint or "unknown", response.status_code, size, time.perf_counter() - start)
+    return response
+
+# --- On-demand profiling (ENABLE_PROFILING=true, then 'X-Profile: 1' header or '?profile=1') ---
+@app.before_request
+def start_request_profile():
+    g.profile_state = start_profile() if profiling_requested(request) else None
+
+@app.after_request
+def write_request_profile(response):
+    state = g.get("profile_state")
+    if state is None:
+        return response
+    stop_profile(state)
+    request_body = request.get_json(silent=True) or {}
+    response_body = (response.get_json(silent=True) or {}) if response.is_json else {}
+    sql = request_body.get("sql") or response_body.get("sql") or response_body.get("sql_query")
+    profile_id = finish_profile(state, request.endpoint, request_body.get("question"), sql, response.status_code)
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+# --- Tenant routing: every /api/ request works against one tenant's database ---
+@app.before_request
+def resolve_request_tenant():
+    g.tenant_id = DEFAULT_TENANT_ID
+    if not request.path.startswith("/api/"):
+        return None
+    body = request.get_json(silent=True) or {}
+    tenant_id = request.headers.get("X-Tenant-Id") or request.args.get("tenant_id") or body.get("tenant_id")
+    try:
+        g.tenant_id = validate_tenant_id(tenant_id)
+        ensure_tenant_database(g.tenant_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return None
+
+def tenant_session_id(session_id):
+    # Conversation and prefetch state is keyed per tenant, so equal session ids never share results
+    return f"{g.tenant_id}:{session_id}" if session_id else None
+
+@app.teardown_request
+def release_request_profile(exc):
+    state = g.get("profile_state")
+    if state is not None:
+        discard_profile(state)
+
+# --- Prometheus scrape endpoint ---
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 # --- Main Route: Serves the HTML page ---
 @app.route("/", methods=["GET"])
@@ -80,52 +144,130 @@ def index():
 # --- Sequential API Endpoints for Progressive Rendering ---
 # ==============================================================================
 
+# Follow-ups ("only items above 100", "sort by clicks", "top 5") are answered from the session's
+# previous result with pandas; anything else goes to the LLM with the previous question/SQL as context.
+def generate_sql_in_session(question, session_id, timings=None):
+    """Returns (sql_query, followup) where followup is None or {"mode": "local"|"sql", ...}."""
+    with stage_timer("followup_planning", timings):
+        followup = answer_followup(session_id, question)
+    if followup is not None:
+        set_pending_result(session_id, followup["sql"], followup["data_frame"])
+        return followup["sql"], {"mode": "local", "steps": followup["plan"]["steps"], "data_frame": followup["data_frame"]}
+
+    context = get_context(session_id)
+    # A prefetch started while the user was typing this question may already have the SQL.
+    # Waiting for it is timed as its own stage so it does not inflate sql_generation.
+    with stage_timer("prefetch_wait", timings):
+        sql_query = take_prefetched_sql(session_id, question, context["sql"] if context else None)
+    if sql_query is None:
+        with stage_timer("sql_generation", timings):
+            sql_query = sql_for_question(question, context)
+    return sql_query, ({"mode": "sql"} if context else None)
+
+def sql_for_question(question, context):
+    if context is None:
+        return question_to_sql(question)
+    return question_to_sql(question, context["question"], context["sql"])
+
+def fetch_result_frame(session_id, sql_query, timings=None):
+    """Prefetched rows for this SQL if there are any, otherwise runs it. Returns the run_sql_query_helper() dict."""
+    result_df = pop_prefetched_rows(session_id, sql_query)
+    if result_df is not None:
+        record_cache_hit("prefetch")
+        return {"success": True, "data_frame": result_df}
+    with stage_timer("sql_execution", timings):
+        return run_sql_query_helper(sql_query, g.tenant_id)
+
 @app.route("/api/generate_sql", methods=["POST"])
 def api_generate_sql():
     user_question = request.json.get("question")
+    session_id = tenant_session_id(request.json.get("session_id"))
     if not user_question:
         return jsonify({"error": "Missing 'question' in request."}), 400
     
     try:
-        sql_query = question_to_sql(user_question)
+        sql_query, followup = generate_sql_in_session(user_question, session_id)
         if sql_query.startswith("-- ERROR:"):
             return jsonify({
                 "question": user_question,
                 "error": f"SQL generation failed: {sql_query.replace('-- ERROR: ', '')}"
             }), 500
-        return jsonify({"success": True, "sql": sql_query}), 200
+        response_body = {"success": True, "sql": sql_query}
+        if followup is not None:
+            response_body["followup"] = {k: v for k, v in followup.items() if k != "data_frame"}
+        return jsonify(response_body), 200
     except Exception as e:
         return jsonify({"error": f"SQL generation internal error: {str(e)}"}), 500
 
+# Speculative prefetch: main.js posts the partial question (debounced) while the user types.
+# Runs in the background and returns immediately; a newer prefetch for the session cancels the older one.
+@app.route("/api/prefetch", methods=["POST"])
+def api_prefetch():
+    user_question = request.json.get("question")
+    session_id = tenant_session_id(request.json.get("session_id"))
+    if not user_question or not session_id:
+        return jsonify({"error": "Missing 'question' or 'session_id' in request."}), 400
+
+    # Follow-ups answered from the previous result are already cheap; nothing to warm.
+    # Only plan here: applying the plan happens once, on submit.
+    context = get_context(session_id)
+    if context is not None and plan_followup(user_question, context.get("data_frame")) is not None:
+        return jsonify({"success": True, "status": "local"}), 200
+
+    tenant_id = g.tenant_id # 'g' is not available in the prefetch worker thread
+    status = schedule_prefetch(session_id, user_question, context["sql"] if context else None,
+                               lambda: sql_for_question(user_question, context),
+                               lambda: tenant_connection(tenant_id))
+    if status == "rate_limited":
+        return jsonify({"error": "Too many prefetch requests for this session.", "status": status}), 429
+    return jsonify({"success": True, "status": status}), 202 if status == "scheduled" else 200
+
 @app.route("/api/execute_query", methods=["POST"])
 def api_execute_query():
     sql_query = request.json.get("sql")
     user_question = request.json.get("question") 
+    session_id = tenant_session_id(request.json.get("session_id"))
     if not sql_query:
         return jsonify({"error": "Missing 'sql' in request."}), 400
+    result_format = negotiate_format(request)
+    format_error = format_unavailable_reason(result_format)
+    if format_error:
+        return jsonify({"error": format_error}), 406
     
-    query_execution_result = run_sql_query_helper(sql_query)
-    
-    if query_execution_result.get("error"):
-        return jsonify({"error": query_execution_result["error"]}), 500
-    
-    result_df = query_execution_result['data_frame']
-    
-    raw_results_html = ""
-    raw_results_records = []
-    if not result_df.empty:
-        raw_results_html = result_df.to_html(classes="table table-striped", index=False)
-        raw_results_records = result_df.to_dict(orient="records") 
+    # A follow-up answered in /api/generate_sql already has its result; skip SQLite for it
+    result_df = pop_pending_result(session_id, sql_query)
+    if result_df is not None:
+        record_cache_hit("followup")
     else:
-        raw_results_html = "<div class='text-danger'>❌ No matching data found in database.</div>"
+        query_execution_result = fetch_result_frame(session_id, sql_query)
+        
+        if query_execution_result.get("error"):
+            return jsonify({"error": query_execution_result["error"]}), 500
+        
+        result_df = query_execution_result['data_frame']
+    record_rows_returned(len(result_df))
+    save_context(session_id, user_question, sql_query, result_df)
+
+    # Serialize only what the client asked for (format= or Accept): CSV/Arrow bodies,
+    # columnar or row JSON, and the HTML table only for format=html (the web UI).
+    if result_format in ("csv", "arrow"):
+        return file_response(result_df, result_format, {"sql": sql_query, "question": user_question})
 
-    return jsonify({
+    response_body = {
         "success": True, 
-        "raw_results_html": raw_results_html,
-        "raw_results_records": raw_results_records, 
         "sql": sql_query, 
         "question": user_question 
-    }), 200
+    }
+    if result_format == "columnar":
+        response_body["raw_results_columns"] = rows_payload(result_df, result_format)
+    else:
+        response_body["raw_results_records"] = rows_payload(result_df, result_format)
+    if result_format == "html":
+        if not result_df.empty:
+            response_body["raw_results_html"] = result_df.to_html(classes="table table-striped", index=False)
+        else:
+            response_body["raw_results_html"] = "<div class='text-danger'>❌ No matching data found in database.</div>"
+    return jsonify(response_body), 200
 
 @app.route("/api/generate_chart", methods=["POST"])
 def api_generate_chart():
@@ -138,7 +280,8 @@ def api_generate_chart():
     
     result_df = pd.DataFrame(raw_results_records)
 
-    chart_data_json = generate_chart(result_df, user_question) 
+    with stage_timer("chart_building"):
+        chart_data_json = generate_chart(result_df, user_question) 
     
     return jsonify({"success": True, "chart_data_json": chart_data_json}), 200
 
@@ -153,10 +296,31 @@ def api_humanize_answer():
     
     result_df = pd.DataFrame(raw_results_records)
 
-    final_answer = humanize_answer(user_question, sql_query, result_df)
+    with stage_timer("humanization"):
+        final_answer = humanize_answer(user_question, sql_query, result_df)
     
     return jsonify({"success": True, "answer": final_answer}), 200
 
+# ==============================================================================
+# --- KPI Dashboard Endpoint (no LLM involved) ---
+# Returns RoAS, CPC, CTR, ACoS, conversion rate and ad share of sales for all items
+# in columnar form: {"columns": [...], "data": {column: [values]}, "totals": {...}}
+# ==============================================================================
+@app.route("/api/kpis", methods=["GET"])
+def api_kpis():
+    start_date = request.args.get("start_date")
+    end_date = request.args.get("end_date")
+
+    try:
+        with stage_timer("kpi_computation"):
+            kpis = get_kpis(g.tenant_id, start_date, end_date)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({"error": f"SQLite error: {str(e)}"}), 500
+
+    return jsonify({"success": True, **kpis}), 200
+
 # ==============================================================================
 # --- Original /api/ask Endpoint (for external usage - largely unchanged) ---
 # This endpoint can remain as a single, combined response for external clients
@@ -169,14 +333,22 @@ def ask_api():
         return jsonify({"error": "Missing 'question' in request"}), 400
 
     question = data["question"]
+    session_id = tenant_session_id(data.get("session_id"))
+    result_format = negotiate_format(request)
+    format_error = format_unavailable_reason(result_format)
+    if format_error:
+        return jsonify({"question": question, "error": format_error}), 406
     sql_query = None
     answer = None
-    raw_results_records = [] 
-    html_table = ""
+    html_table = None
     chart_data_json = None 
+    timings = {}
+    include_timings = ATTACH_TIMINGS or bool(data.get("include_timings"))
+    # CSV/Arrow clients get the rows as the body; a Plotly figure is of no use to them
+    wants_chart = result_format not in ("csv", "arrow")
     
     try:
-        sql_query = question_to_sql(question)
+        sql_query, followup = generate_sql_in_session(question, session_id, timings)
 
         if sql_query.startswith("-- ERROR:"):
             return jsonify({
@@ -184,33 +356,53 @@ def ask_api():
                 "error": f"SQL generation failed: {sql_query.replace('-- ERROR: ', '')}"
             }), 500
 
-        query_execution_result = run_sql_query_helper(sql_query) 
-        if query_execution_result.get("error"):
-            return jsonify({
-                "question": question,
-                "error": query_execution_result["error"]
-            }), 500
-
-        result_df = query_execution_result['data_frame']
+        if followup is not None and followup["mode"] == "local":
+            pop_pending_result(session_id, sql_query)
+            record_cache_hit("followup")
+            result_df = followup["data_frame"]
+        else:
+            query_execution_result = fetch_result_frame(session_id, sql_query, timings)
+            if query_execution_result.get("error"):
+                return jsonify({
+                    "question": question,
+                    "error": query_execution_result["error"]
+                }), 500
+            result_df = query_execution_result['data_frame']
+        record_rows_returned(len(result_df))
+        save_context(session_id, question, sql_query, result_df)
         
         if not result_df.empty:
-            raw_results_records = result_df.to_dict(orient="records")
-            html_table = result_df.to_html(index=False, classes="table table-bordered")
-            chart_data_json = generate_chart(result_df, question) 
-        else:
+            if result_format == "html":
+                html_table = result_df.to_html(index=False, classes="table table-bordered")
+            if wants_chart:
+                with stage_timer("chart_building", timings):
+                    chart_data_json = generate_chart(result_df, question) 
+        elif result_format == "html":
             html_table = "<div style='color: #dc3545;'>No data found for this query.</div>"
-            chart_data_json = None 
 
-        answer = humanize_answer(question, sql_query, result_df)
+        with stage_timer("humanization", timings):
+            answer = humanize_answer(question, sql_query, result_df)
 
-        return jsonify({
+        if result_format in ("csv", "arrow"):
+            return file_response(result_df, result_format, {"question": question, "sql_query": sql_query, "answer": answer})
+
+        response_body = {
             "question": question,
             "sql_query": sql_query,
             "answer": answer,
-            "raw_results": raw_results_records, 
-            "html_table": html_table,           
             "chart_data_json": chart_data_json, 
-        })
+        }
+        if result_format == "columnar":
+            response_body["raw_results_columns"] = rows_payload(result_df, result_format)
+        else:
+            response_body["raw_results"] = rows_payload(result_df, result_format)
+        if html_table is not None:
+            response_body["html_table"] = html_table
+        if followup is not None:
+            response_body["followup"] = {k: v for k, v in followup.items() if k != "data_frame"}
+        if include_timings:
+            response_body["timings"] = timings
+        return jsonify(response_body)
 
     except Exception as e:
         return jsonify({
@@ -1,7 +1,18 @@
-import google.generativeai as genai
+import os
 
-# Model for generating SQL queries
-SQL_GEN_MODEL = genai.GenerativeModel('models/gemini-1.5-flash') 
+# 'gemini' (default) calls the Google API; 'stub' uses a deterministic local model for offline benchmarks.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
 
-# Model for humanizing the final answer
-HUMANIZE_MODEL = genai.GenerativeModel('models/gemini-1.5-flash') 
\ No newline at end of file
+if LLM_BACKEND == "stub":
+    from models.stub_models import StubGenerativeModel
+
+    SQL_GEN_MODEL = StubGenerativeModel('stub-sql')
+    HUMANIZE_MODEL = StubGenerativeModel('stub-humanize')
+else:
+    import google.generativeai as genai
+
+    # Model for generating SQL queries
+    SQL_GEN_MODEL = genai.GenerativeModel('models/gemini-1.5-flash') 
+
+    # Model for humanizing the final answer
+    HUMANIZE_MODEL = genai.GenerativeModel('models/gemini-1.5-flash') 
@@ -0,0 +1,80 @@
+# models/stub_corpus.py
+
+# Questions with known-good SQL, used by the stub LLM backend and the offline benchmarks.
+# Seeded from the few-shot examples in the SQL generation prompt and the demo questions in roadmap.txt.
+STUB_CORPUS = [
+    # --- Few-shot examples from SQL_GEN_PROMPT ---
+    {
+        "question": "What is my total sales?",
+        "sql": "SELECT SUM(total_sales) FROM total_sales_metrics;",
+    },
+    {
+        "question": "Calculate the RoAS (Return on Ad Spend).",
+        "sql": "SELECT SUM(ad_sales) * 100.0 / SUM(ad_spend) FROM ad_sales_metrics WHERE ad_spend > 0;",
+    },
+    {
+        "question": "Which product had the highest CPC (Cost per click)?",
+        "sql": "SELECT item_id, SUM(ad_spend) * 1.0 / SUM(clicks) AS cpc FROM ad_sales_metrics WHERE clicks > 0 GROUP BY item_id ORDER BY cpc DESC LIMIT 1;",
+    },
+    {
+        "question": "What was the total ad spend for item 4 on June 1, 2025?",
+        "sql": "SELECT ad_spend FROM ad_sales_metrics WHERE item_id = 4 AND date = '2025-06-01';",
+    },
+    {
+        "question": "Show me the total units ordered across all products for the entire month of June 2025.",
+        "sql": "SELECT SUM(total_units_ordered) FROM total_sales_metrics WHERE date BETWEEN '2025-06-01' AND '2025-06-30';",
+    },
+    {
+        "question": "List all products that were not eligible for advertising on 2025-06-04, and also provide their reason.",
+        "sql": "SELECT item_id, message FROM product_eligibility WHERE eligibility = FALSE AND STRFTIME('%Y-%m-%d', eligibility_datetime_utc) = '2025-06-04';",
+    },
+    {
+        "question": "Find the product with the highest ad sales on June 1, 2025.",
+        "sql": "SELECT item_id FROM ad_sales_metrics WHERE date = '2025-06-01' ORDER BY ad_sales DESC LIMIT 1;",
+    },
+    {
+        "question": "How many products were eligible on June 4, 2025?",
+        "sql": "SELECT COUNT(DISTINCT item_id) FROM product_eligibility WHERE eligibility = TRUE AND STRFTIME('%Y-%m-%d', eligibility_datetime_utc) = '2025-06-04';",
+    },
+    {
+        "question": "Which products are currently ineligible, and why?",
+        "sql": "SELECT item_id, message FROM eligibility_latest WHERE eligibility = FALSE;",
+    },
+    {
+        "question": "Was item 29 eligible on 2025-06-05?",
+        "sql": "SELECT eligibility, message FROM eligibility_intervals WHERE item_id = 29 AND valid_from <= '2025-06-05 23:59:59' AND valid_to > '2025-06-05 23:59:59';",
+    },
+    # --- Demo questions from roadmap.txt ---
+    {
+        "question": "What was the total ad spend for item 4 on 2025-06-01?",
+        "sql": "SELECT ad_spend FROM ad_sales_metrics WHERE item_id = 4 AND date = '2025-06-01';",
+    },
+    {
+        "question": "Show the total impressions and clicks for item 4 over the days in June 2025.",
+        "sql": "SELECT date, SUM(impressions) AS total_impressions, SUM(clicks) AS total_clicks FROM ad_sales_metrics WHERE item_id = 4 AND date BETWEEN '2025-06-01' AND '2025-06-30' GROUP BY date ORDER BY date;",
+    },
+    {
+        "question": "What were the total ad sales for each item on 2025-06-01?",
+        "sql": "SELECT item_id, SUM(ad_sales) AS total_ad_sales FROM ad_sales_metrics WHERE date = '2025-06-01' GROUP BY item_id;",
+    },
+    {
+        "question": "Show me the ad sales and total sales for item 4 on 2025-06-01.",
+        "sql": "SELECT asm.ad_sales, tsm.total_sales, asm.ad_spend FROM ad_sales_metrics AS asm INNER JOIN total_sales_metrics AS tsm ON asm.item_id = tsm.item_id AND asm.date = tsm.date WHERE asm.item_id = 4 AND asm.date = '2025-06-01';",
+    },
+    {
+        "question": "What are the various ad spend amounts for products on 2025-06-01?",
+        "sql": "SELECT ad_spend FROM ad_sales_metrics WHERE date = '2025-06-01';",
+    },
+    {
+        "question": "Which product had the highest CPC (Cost Per Click)?",
+        "sql": "SELECT item_id, SUM(ad_spend) * 1.0 / SUM(clicks) AS cpc FROM ad_sales_metrics WHERE clicks > 0 GROUP BY item_id ORDER BY cpc DESC LIMIT 1;",
+    },
+    {
+        "question": "Show the daily ad sales, units sold from ads and total units ordered for June 2025.",
+        "sql": "SELECT asm.date, SUM(asm.ad_sales) AS total_ad_sales, SUM(asm.units_sold) AS total_units_sold_from_ads, SUM(tsm.total_units_ordered) AS total_units_ordered FROM ad_sales_metrics AS asm INNER JOIN total_sales_metrics AS tsm ON asm.item_id = tsm.item_id AND asm.date = tsm.date WHERE asm.date BETWEEN '2025-06-01' AND '2025-06-30' GROUP BY asm.date ORDER BY asm.date;",
+    },
+    {
+        "question": "Show impressions and clicks for every product on 2025-06-01.",
+        "sql": "SELECT impressions, clicks FROM ad_sales_metrics WHERE date = '2025-06-01';",
+    },
+]
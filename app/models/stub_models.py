@@ -0,0 +1,56 @@
+# models/stub_models.py
+
+import os
+import re
+import time
+
+from models.stub_corpus import STUB_CORPUS
+
+# Artificial latency per call, to mimic the round trip to Gemini in benchmarks/load tests.
+STUB_LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "0"))
+# SQL returned for questions that are not in the corpus.
+STUB_FALLBACK_SQL = "SELECT item_id, SUM(ad_sales) AS total_ad_sales FROM ad_sales_metrics GROUP BY item_id ORDER BY total_ad_sales DESC LIMIT 10;"
+
+
+def normalize_question(question):
+    """Lowercases and strips punctuation/extra whitespace so near-identical questions match."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s-]", " ", question.lower())).strip()
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """
+    Deterministic local stand-in for genai.GenerativeModel.
+    SQL prompts are answered from STUB_CORPUS, humanization prompts with a fixed template.
+    """
+
+    def __init__(self, model_name="stub", latency_ms=None):
+        self.model_name = model_name
+        self.latency_ms = STUB_LLM_LATENCY_MS if latency_ms is None else latency_ms
+        self.responses = {normalize_question(entry["question"]): entry["sql"] for entry in STUB_CORPUS}
+
+    def generate_content(self, prompt):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+        if "Here is the result of the query:" in prompt:
+            return StubResponse(self._humanize(prompt))
+
+        # The SQL prompt ends with "Question: {question}\nSQL:"; take the last (real) question.
+        questions = re.findall(r"Question:\s*(.*?)\s*\nSQL:", prompt, flags=re.DOTALL)
+        question = questions[-1] if questions else ""
+        return StubResponse(self.responses.get(normalize_question(question), STUB_FALLBACK_SQL))
+
+    def _humanize(self, prompt):
+        result_text = prompt.split("Here is the result of the query:", 1)[1]
+        result_text = result_text.split("Please answer the original question", 1)[0].strip()
+        lines = [line for line in result_text.splitlines() if line.strip()]
+        rows = lines[2:] # Markdown table: header + separator + rows
+        if not rows:
+            return "I could not find any matching data for your question."
+        first_row = " ".join(rows[0].strip("| ").split())
+        return f"Based on the data, the query returned {len(rows)} row(s). First result: {first_row}"
@@ -62,6 +62,27 @@ function stopLoadingAnimation() {
 }
 
 
+// Per-tab conversation id so follow-up questions can build on the previous result
+function getSessionId() {
+    let sessionId = sessionStorage.getItem('sessionId');
+    if (!sessionId) {
+        sessionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        sessionStorage.setItem('sessionId', sessionId);
+    }
+    return sessionId;
+}
+
+// Sellers open the UI as /?tenant_id=<id>; every API call is routed to that tenant's database
+function requestHeaders() {
+    const headers = { 'Content-Type': 'application/json' };
+    const tenantId = new URLSearchParams(window.location.search).get('tenant_id');
+    if (tenantId) {
+        headers['X-Tenant-Id'] = tenantId;
+    }
+    return headers;
+}
+
+
 document.addEventListener('DOMContentLoaded', () => { 
 
     window.scrollTo(0, 0); 
@@ -128,11 +149,44 @@ document.addEventListener('DOMContentLoaded', () => {
         formLabel.classList.add('hide-animation');
     }
 
+    // Speculative prefetch: once typing pauses, let the server start on the SQL and rows
+    // so they are often ready on submit. A newer prefetch aborts the previous request.
+    const PREFETCH_DEBOUNCE_MS = 600;
+    const PREFETCH_MIN_CHARS = 12;
+    let prefetchTimeout;
+    let prefetchController = null;
+    let lastPrefetchedQuestion = '';
+
+    function cancelPendingPrefetch() {
+        clearTimeout(prefetchTimeout);
+    }
+
+    questionInput.addEventListener('input', () => {
+        cancelPendingPrefetch();
+        const partialQuestion = questionInput.value.trim();
+        if (partialQuestion.length < PREFETCH_MIN_CHARS || partialQuestion === lastPrefetchedQuestion) {
+            return;
+        }
+        prefetchTimeout = setTimeout(() => {
+            if (prefetchController) { prefetchController.abort(); }
+            prefetchController = new AbortController();
+            lastPrefetchedQuestion = partialQuestion;
+            fetch('/api/prefetch', {
+                method: 'POST',
+                headers: requestHeaders(),
+                body: JSON.stringify({ question: partialQuestion, session_id: getSessionId() }),
+                signal: prefetchController.signal,
+            }).catch(() => {}); // Best effort; submit works the same without it
+        }, PREFETCH_DEBOUNCE_MS);
+    });
+
     // --- Main Query Submission Logic (Refactored for Sequential API Calls) ---
     queryForm.addEventListener('submit', async function(event) {
         event.preventDefault();
 
         const question = questionInput.value;
+        cancelPendingPrefetch();
+        lastPrefetchedQuestion = '';
 
         // Reset UI states
         resultsContainer.style.display = 'none';
@@ -159,8 +213,8 @@ document.addEventListener('DOMContentLoaded', () => {
             startLoadingAnimation('sql');
             const sqlResponse = await fetch('/api/generate_sql', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ question: question }),
+                headers: requestHeaders(),
+                body: JSON.stringify({ question: question, session_id: getSessionId() }),
             });
             const sqlData = await sqlResponse.json();
             console.log(sqlData);
@@ -179,8 +233,8 @@ document.addEventListener('DOMContentLoaded', () => {
             // Stage 2: Execute Query
             const queryResponse = await fetch('/api/execute_query', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ sql: generatedSql, question: question }), // Pass question for context
+                headers: requestHeaders(),
+                body: JSON.stringify({ sql: generatedSql, question: question, session_id: getSessionId(), format: 'html' }), // Pass question for context; 'html' adds the results table
             });
             const queryData = await queryResponse.json();
             console.log(queryData);
@@ -195,7 +249,7 @@ document.addEventListener('DOMContentLoaded', () => {
             // Stage 3: Generate Chart
             const chartResponse = await fetch('/api/generate_chart', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: requestHeaders(),
                 body: JSON.stringify({ raw_results_records: rawResultsRecords, sql: generatedSql, question: question }),
             });
             const chartData = await chartResponse.json();
@@ -225,7 +279,7 @@ document.addEventListener('DOMContentLoaded', () => {
             // Stage 4: Humanize Answer
             const humanizeResponse = await fetch('/api/humanize_answer', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: requestHeaders(),
                 body: JSON.stringify({ raw_results_records: rawResultsRecords, sql: generatedSql, question: question }),
             });
             const humanizeData = await humanizeResponse.json();
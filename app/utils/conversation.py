@@ -0,0 +1,294 @@
+# utils/conversation.py
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# --- Configuration ---
+MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+SESSION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", "1800"))
+MAX_RETAINED_ROWS = int(os.getenv("CONVERSATION_MAX_ROWS", "100000")) # Larger results are not kept for follow-ups
+
+_sessions = OrderedDict() # session_id -> context dict
+_sessions_lock = threading.Lock()
+
+
+# ==============================================================================
+# --- Session context store ---
+# ==============================================================================
+
+def _live_context(session_id):
+    # Caller holds _sessions_lock
+    context = _sessions.get(session_id)
+    if context is None:
+        return None
+    if time.time() - context["updated_at"] > SESSION_TTL_SECONDS:
+        del _sessions[session_id]
+        return None
+    _sessions.move_to_end(session_id)
+    return context
+
+
+def get_context(session_id):
+    """Returns the session's last {question, sql, data_frame, ...} or None if unknown/expired."""
+    if not session_id:
+        return None
+    with _sessions_lock:
+        return _live_context(session_id)
+
+
+def save_context(session_id, question, sql, result_df):
+    """Remembers the latest answered question and its result frame for follow-ups."""
+    if not session_id:
+        return
+    context = {
+        "question": question,
+        "sql": sql,
+        "data_frame": result_df if len(result_df) <= MAX_RETAINED_ROWS else None,
+        "pending": None,
+        "updated_at": time.time(),
+    }
+    with _sessions_lock:
+        _sessions[session_id] = context
+        _sessions.move_to_end(session_id)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+
+
+def set_pending_result(session_id, sql, result_df):
+    """Stashes a locally computed follow-up result so /api/execute_query can return it without SQLite."""
+    if not session_id:
+        return
+    with _sessions_lock:
+        context = _live_context(session_id)
+        if context is not None:
+            context["pending"] = {"sql": sql, "data_frame": result_df}
+
+
+def pop_pending_result(session_id, sql):
+    """Returns (and clears) the stashed follow-up result if it belongs to this SQL, else None."""
+    if not session_id:
+        return None
+    with _sessions_lock:
+        context = _live_context(session_id)
+        if context is None or not context.get("pending") or context["pending"]["sql"] != sql:
+            return None
+        pending, context["pending"] = context["pending"], None
+    return pending["data_frame"]
+
+
+# ==============================================================================
+# --- Follow-up planning: filters / sorts / top-N on the previous result ---
+# ==============================================================================
+
+_COMPARATORS = [
+    (r"greater than or equal to|at least|>=|no less than", ">="),
+    (r"less than or equal to|at most|<=|no more than", "<="),
+    (r"above|over|greater than|more than|higher than|>", ">"),
+    (r"below|under|less than|lower than|fewer than|<", "<"),
+    (r"equal to|equals|exactly|=", "=="),
+]
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+
+# Words that may appear in a refinement without changing its meaning.
+_FILLER_WORDS = {
+    "only", "just", "show", "me", "the", "those", "these", "them", "it", "its", "item", "items", "product",
+    "products", "row", "rows", "result", "results", "with", "where", "and", "then", "now", "please", "keep",
+    "filter", "to", "that", "are", "is", "have", "has", "a", "an", "of", "instead", "so", "but", "which",
+    "whose", "value", "values", "give", "list", "return", "display", "same", "ones", "what", "about", "all",
+    "also",
+}
+
+
+def _normalize(text):
+    return re.sub(r"[^a-z0-9_]+", " ", text.lower()).strip()
+
+
+def _resolve_column(phrase, df, whole_phrase=False):
+    """Maps a phrase like 'ad sales' or 'clicks' to a column of df, or None."""
+    phrase = _normalize(phrase)
+    if not phrase:
+        return None
+    words = phrase.split()
+    # Try the longest trailing word sequence first ("total ad sales" -> "ad sales" -> "sales"),
+    # or only the full phrase when every word must be accounted for.
+    for start in range(1 if whole_phrase else len(words)):
+        candidate = "_".join(words[start:])
+        if candidate in _FILLER_WORDS:
+            continue
+        for col in df.columns:
+            if _normalize(str(col)).replace(" ", "_") == candidate:
+                return col
+        matches = [col for col in df.columns if candidate in _normalize(str(col)).replace(" ", "_")]
+        if len(matches) == 1:
+            return matches[0]
+    return None
+
+
+def _default_measure(df):
+    """The column a bare 'above 100' / 'top 5' refers to: the first numeric, non-ID column."""
+    numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    measures = [col for col in numeric if not re.search(r"(^|_)id$", str(col).lower())]
+    return (measures or numeric or [None])[0]
+
+
+def plan_followup(question, df):
+    """
+    Parses a refinement of the previous result ("only items above 100", "sort by clicks",
+    "top 5", "only item 4") into a list of steps. Returns None when the question needs
+    anything else, so the caller falls back to SQL generation.
+    """
+    if df is None or df.empty:
+        return None
+
+    text = question.lower().strip().rstrip("?.!")
+    steps = []
+    consumed = []
+
+    def consume(match):
+        consumed.append(match.span())
+
+    # --- item filters: "only item 4", "items 3, 5 and 7", "exclude item 2" ---
+    if "item_id" in df.columns:
+        for match in re.finditer(r"\b(only|just|exclude|excluding|without|except)?\s*items?\s+((?:\d+\s*(?:,|and|or)?\s*)+)", text):
+            ids = [int(x) for x in re.findall(r"\d+", match.group(2))]
+            exclude = match.group(1) in ("exclude", "excluding", "without", "except")
+            steps.append({"op": "filter_in", "column": "item_id", "values": ids, "exclude": exclude})
+            consume(match)
+
+    # --- numeric comparisons: "above 100", "clicks over 20", "with ad sales at least 50" ---
+    for pattern, operator in _COMPARATORS:
+        for match in re.finditer(rf"((?:[a-z_]+\s+){{0,3}})(?:is\s+|are\s+)?(?:{pattern})\s*{_NUMBER}", text):
+            if any(s <= match.start(0) < e for s, e in consumed):
+                continue
+            # A bare "above 100" means the default measure; a named column must resolve exactly,
+            # otherwise ("clicks" not in the result, or "sales" matching two columns) fall back to SQL.
+            named = [word for word in _normalize(match.group(1)).split() if word not in _FILLER_WORDS]
+            column = _resolve_column(" ".join(named), df, whole_phrase=True) if named else _default_measure(df)
+            if column is None or not pd.api.types.is_numeric_dtype(df[column]):
+                return None
+            steps.append({"op": "filter", "column": column, "operator": operator, "value": float(match.group(2))})
+            consume(match)
+
+    # --- sorting: "sort by clicks", "order by ad spend ascending" ---
+    sort_match = re.search(r"\b(?:sort|sorted|order|ordered|rank|ranked|arrange)\s+(?:them\s+|it\s+|results\s+)?by\s+"
+                           r"([a-z_ ]+?)(?:\s+(asc|ascending|desc|descending|increasing|decreasing|lowest first|highest first))?"
+                           r"(?=$|,|\s+(?:and|then)\b)", text)
+    if sort_match:
+        column = _resolve_column(sort_match.group(1), df)
+        if column is None:
+            return None
+        ascending = sort_match.group(2) in ("asc", "ascending", "increasing", "lowest first")
+        steps.append({"op": "sort", "column": column, "ascending": ascending})
+        consume(sort_match)
+
+    # --- top/bottom N: "top 5", "bottom 3 by clicks", "first 10" ---
+    limit_match = re.search(r"\b(top|highest|best|bottom|lowest|worst|first)\s+(\d+)(?:\s+by\s+([a-z_ ]+?))?(?=$|,|\s+(?:and|then)\b)", text)
+    if limit_match:
+        word, n, by = limit_match.group(1), int(limit_match.group(2)), limit_match.group(3)
+        if word == "first":
+            steps.append({"op": "limit", "n": n})
+        else:
+            column = _resolve_column(by, df) if by else None
+            if by and column is None:
+                return None
+            if column is None and not any(step["op"] == "sort" for step in steps):
+                column = _default_measure(df)
+            if column is not None:
+                steps.append({"op": "sort", "column": column, "ascending": word in ("bottom", "lowest", "worst")})
+            steps.append({"op": "limit", "n": n})
+        consume(limit_match)
+
+    if not steps:
+        return None
+
+    # Everything not consumed by a step must be filler, otherwise this is a new question.
+    leftover = list(text)
+    for start, end in consumed:
+        leftover[start:end] = [" "] * (end - start)
+    if any(word not in _FILLER_WORDS for word in _normalize("".join(leftover)).split()):
+        return None
+
+    # Filters first, then sorting, then limits, matching SQL's WHERE / ORDER BY / LIMIT.
+    order = {"filter_in": 0, "filter": 0, "sort": 1, "limit": 2}
+    steps.sort(key=lambda step: order[step["op"]])
+    return {"steps": steps}
+
+
+def apply_plan(df, plan):
+    """Executes a follow-up plan on a result frame with pandas."""
+    result = df
+    for step in plan["steps"]:
+        if step["op"] == "filter_in":
+            mask = result[step["column"]].isin(step["values"])
+            result = result[~mask] if step["exclude"] else result[mask]
+        elif step["op"] == "filter":
+            column = result[step["column"]]
+            result = result[{
+                ">": column > step["value"], ">=": column >= step["value"],
+                "<": column < step["value"], "<=": column <= step["value"],
+                "==": column == step["value"],
+            }[step["operator"]]]
+        elif step["op"] == "sort":
+            result = result.sort_values(step["column"], ascending=step["ascending"], kind="mergesort")
+        elif step["op"] == "limit":
+            result = result.head(step["n"])
+    return result.reset_index(drop=True)
+
+
+def _quote(column):
+    return '"' + str(column).replace('"', '""') + '"'
+
+
+def _literal(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def plan_to_sql(previous_sql, plan):
+    """
+    Equivalent SQL for a follow-up plan, wrapping the previous query. It is what the UI
+    shows and what later follow-ups (or a SQL fallback) build on.
+    """
+    where, order_by, limit = [], None, None
+    for step in plan["steps"]:
+        if step["op"] == "filter_in":
+            values = ", ".join(str(v) for v in step["values"])
+            where.append(f"{_quote(step['column'])} {'NOT IN' if step['exclude'] else 'IN'} ({values})")
+        elif step["op"] == "filter":
+            operator = "=" if step["operator"] == "==" else step["operator"]
+            where.append(f"{_quote(step['column'])} {operator} {_literal(step['value'])}")
+        elif step["op"] == "sort":
+            order_by = f"{_quote(step['column'])} {'ASC' if step['ascending'] else 'DESC'}"
+        elif step["op"] == "limit":
+            limit = step["n"]
+
+    sql = f"SELECT * FROM ({previous_sql.strip().rstrip(';')}) AS previous_result"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += f" LIMIT {limit}"
+    return sql + ";"
+
+
+def answer_followup(session_id, question):
+    """
+    Tries to answer 'question' from the session's previous result.
+    Returns {"sql", "data_frame", "plan"} on success, or None when SQL generation is needed.
+    """
+    context = get_context(session_id)
+    if context is None or context.get("data_frame") is None:
+        return None
+    plan = plan_followup(question, context["data_frame"])
+    if plan is None:
+        return None
+    return {
+        "sql": plan_to_sql(context["sql"], plan),
+        "data_frame": apply_plan(context["data_frame"], plan),
+        "plan": plan,
+    }
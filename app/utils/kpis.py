@@ -0,0 +1,149 @@
+# utils/kpis.py
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from db.tenants import ensure_tenant_database, tenant_connection
+from utils.metrics import record_cache_hit
+
+# --- Configuration ---
+KPI_CACHE_SIZE = int(os.getenv("KPI_CACHE_SIZE", "64")) # Distinct (date range, data version) results kept
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Rates follow the definitions used in the SQL prompt examples (RoAS = ad_sales * 100 / ad_spend):
+# roas, ctr, acos, conversion_rate and ad_share_of_sales are percentages; cpc is spend per click.
+KPI_COLUMNS = [
+    "item_id", "ad_sales", "ad_spend", "impressions", "clicks", "units_sold", "total_sales", "total_units_ordered",
+    "roas", "cpc", "ctr", "acos", "conversion_rate", "ad_share_of_sales",
+]
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _data_version(db_file):
+    # Any committed write changes the file's mtime/size, which invalidates cached KPIs.
+    stat = os.stat(db_file)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    """Element-wise numerator / denominator * scale, NaN where the denominator is zero."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator * scale, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def _derived_metrics(sums):
+    return {
+        "roas": _ratio(sums["ad_sales"], sums["ad_spend"], 100.0),
+        "cpc": _ratio(sums["ad_spend"], sums["clicks"]),
+        "ctr": _ratio(sums["clicks"], sums["impressions"], 100.0),
+        "acos": _ratio(sums["ad_spend"], sums["ad_sales"], 100.0),
+        "conversion_rate": _ratio(sums["units_sold"], sums["clicks"], 100.0),
+        "ad_share_of_sales": _ratio(sums["ad_sales"], sums["total_sales"], 100.0),
+    }
+
+
+def _to_json_list(values, decimals=4):
+    # NaN/inf -> None so the payload is valid JSON
+    values = np.round(np.atleast_1d(np.asarray(values, dtype=float)), decimals)
+    out = values.astype(object)
+    out[~np.isfinite(values)] = None
+    return out.tolist()
+
+
+def _load_arrays(conn, start_date, end_date):
+    """Reads the raw metric columns for the date range into NumPy arrays (one SQL pass per table)."""
+    # Rows without an item_id cannot be attributed to any item
+    where, params = " AND item_id IS NOT NULL", []
+    if start_date:
+        where += " AND date >= ?"
+        params.append(start_date)
+    if end_date:
+        where += " AND date <= ?"
+        params.append(end_date)
+
+    ad_rows = conn.execute(
+        "SELECT item_id, ad_sales, impressions, ad_spend, clicks, units_sold FROM ad_sales_metrics WHERE 1 = 1" + where,
+        params).fetchall()
+    total_rows = conn.execute(
+        "SELECT item_id, total_sales, total_units_ordered FROM total_sales_metrics WHERE 1 = 1" + where,
+        params).fetchall()
+
+    ad = np.array(ad_rows, dtype=float).reshape(-1, 6)
+    total = np.array(total_rows, dtype=float).reshape(-1, 3)
+    # NULL metrics count as zero; item_id (column 0) is left untouched
+    ad[:, 1:] = np.nan_to_num(ad[:, 1:])
+    total[:, 1:] = np.nan_to_num(total[:, 1:])
+    return ad, total
+
+
+def compute_kpis(conn, start_date=None, end_date=None):
+    """
+    Computes RoAS, CPC, CTR, ACoS, conversion rate and ad share of sales for every item
+    (plus overall totals) in a single vectorized pass. Returns a columnar dict.
+    """
+    ad, total = _load_arrays(conn, start_date, end_date)
+
+    # Map item_ids from both tables onto dense indices, then sum every column with bincount.
+    item_ids, inverse = np.unique(np.concatenate([ad[:, 0], total[:, 0]]), return_inverse=True)
+    ad_idx, total_idx = inverse[:len(ad)], inverse[len(ad):]
+    n_items = len(item_ids)
+
+    sums = {}
+    for col, name in enumerate(["ad_sales", "impressions", "ad_spend", "clicks", "units_sold"], start=1):
+        sums[name] = np.bincount(ad_idx, weights=ad[:, col], minlength=n_items)
+    sums["total_sales"] = np.bincount(total_idx, weights=total[:, 1], minlength=n_items)
+    sums["total_units_ordered"] = np.bincount(total_idx, weights=total[:, 2], minlength=n_items)
+
+    per_item = _derived_metrics(sums)
+    totals_sums = {name: values.sum() for name, values in sums.items()}
+    totals = {name: _to_json_list([value])[0] for name, value in totals_sums.items()}
+    totals.update({name: _to_json_list(values)[0] for name, values in _derived_metrics(totals_sums).items()})
+
+    data = {"item_id": item_ids.astype(int).tolist()}
+    for name in KPI_COLUMNS[1:]:
+        data[name] = _to_json_list(sums[name] if name in sums else per_item[name])
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "row_count": n_items,
+        "columns": KPI_COLUMNS,
+        "data": data,
+        "totals": totals,
+    }
+
+
+def get_kpis(tenant_id, start_date=None, end_date=None):
+    """Cached compute_kpis() keyed by tenant, date range and data version. Raises ValueError on bad dates."""
+    for value in (start_date, end_date):
+        if value and not DATE_PATTERN.match(value):
+            raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+    if start_date and end_date and start_date > end_date:
+        raise ValueError("'start_date' must not be after 'end_date'.")
+
+    db_file = ensure_tenant_database(tenant_id)
+    key = (tenant_id, start_date, end_date, _data_version(db_file))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            record_cache_hit("kpis")
+            return _cache[key]
+
+    with tenant_connection(tenant_id) as conn:
+        result = compute_kpis(conn, start_date, end_date)
+
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > KPI_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
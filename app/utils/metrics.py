@@ -0,0 +1,153 @@
+# utils/metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Histogram bucket boundaries (seconds for latencies, bytes/rows for sizes) ---
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_lock = threading.Lock()
+_counters = {}     # name -> {label_tuple: value}
+_histograms = {}   # name -> {label_tuple: {"buckets": [...], "sum": float, "count": int}}
+_help = {}         # name -> (type, help text, bucket boundaries or None)
+
+
+def _register(name, metric_type, help_text, buckets=None):
+    if name not in _help:
+        _help[name] = (metric_type, help_text, buckets)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def inc_counter(name, amount=1, labels=None, help_text=""):
+    """Increments a Prometheus-style counter."""
+    key = _label_key(labels)
+    with _lock:
+        _register(name, "counter", help_text)
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, labels=None, help_text=""):
+    """Records a single observation into a cumulative histogram."""
+    key = _label_key(labels)
+    with _lock:
+        _register(name, "histogram", help_text, buckets)
+        series = _histograms.setdefault(name, {})
+        hist = series.get(key)
+        if hist is None:
+            hist = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+            series[key] = hist
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """
+    Times a pipeline stage (sql_generation, sql_execution, chart_building, humanization, ...).
+    The duration is recorded in the 'ecom_stage_duration_seconds' histogram and, if a
+    'timings' dict is given, stored there in milliseconds under the stage name.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("ecom_stage_duration_seconds", elapsed, labels={"stage": stage},
+                help_text="Time spent in each question-answering pipeline stage.")
+        if timings is not None:
+            timings[stage] = round(elapsed * 1000, 3)
+
+
+def record_rows_returned(row_count):
+    observe("ecom_rows_returned", row_count, buckets=ROWS_BUCKETS,
+            help_text="Rows returned by executed SQL queries.")
+
+
+def record_response(endpoint, status_code, size_bytes, duration_seconds):
+    labels = {"endpoint": endpoint}
+    if size_bytes is not None:  # Streamed responses have no known length
+        observe("ecom_response_bytes", size_bytes, buckets=BYTES_BUCKETS, labels=labels,
+                help_text="Size of HTTP response bodies.")
+    observe("ecom_request_duration_seconds", duration_seconds, labels=labels,
+            help_text="End-to-end HTTP request latency.")
+    inc_counter("ecom_requests_total", labels={"endpoint": endpoint, "status": str(status_code)},
+                help_text="HTTP requests served.")
+
+
+def record_cache_hit(cache_name):
+    inc_counter("ecom_cache_hits_total", labels={"cache": cache_name},
+                help_text="Cache hits by cache name.")
+
+
+def record_llm_error(model):
+    inc_counter("ecom_llm_errors_total", labels={"model": model},
+                help_text="Failed calls to the LLM backend.")
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile (pct in 0-100) of a list of numbers; None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(values_ms):
+    """p50/p95/p99/mean/min/max summary of latencies in milliseconds, as used by the benchmark scripts."""
+    if not values_ms:
+        return {"count": 0}
+    return {
+        "count": len(values_ms),
+        "p50_ms": round(percentile(values_ms, 50), 3),
+        "p95_ms": round(percentile(values_ms, 95), 3),
+        "p99_ms": round(percentile(values_ms, 99), 3),
+        "mean_ms": round(sum(values_ms) / len(values_ms), 3),
+        "min_ms": round(min(values_ms), 3),
+        "max_ms": round(max(values_ms), 3),
+    }
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = []
+    for k, v in pairs:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name in sorted(_help):
+            metric_type, help_text, buckets = _help[name]
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == "counter":
+                for key, value in sorted(_counters.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            else:
+                for key, hist in sorted(_histograms.get(name, {}).items()):
+                    for bound, count in zip(buckets, hist["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {hist['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist['sum']}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist['count']}")
+    return "\n".join(lines) + "\n"
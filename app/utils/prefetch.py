@@ -0,0 +1,208 @@
+# utils/prefetch.py
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import pandas as pd
+
+from utils.metrics import inc_counter
+
+# --- Configuration ---
+PREFETCH_ENABLED = os.getenv("ENABLE_PREFETCH", "true").lower() == "true"
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+PREFETCH_MAX_IN_FLIGHT = int(os.getenv("PREFETCH_MAX_IN_FLIGHT", str(PREFETCH_WORKERS * 2))) # Beyond this, prefetches are dropped, not queued
+PREFETCH_MIN_CHARS = int(os.getenv("PREFETCH_MIN_CHARS", "12"))       # Shorter partial questions are not worth an LLM call
+PREFETCH_MAX_PER_MINUTE = int(os.getenv("PREFETCH_MAX_PER_MINUTE", "20")) # Per session
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "15"))  # How long a submit waits for a matching in-flight prefetch
+PREFETCH_TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "300"))
+PREFETCH_MAX_ROWS = int(os.getenv("PREFETCH_MAX_ROWS", "100000"))       # Larger results are not kept in memory
+PREFETCH_MAX_SESSIONS = int(os.getenv("PREFETCH_MAX_SESSIONS", "1000"))
+RATE_WINDOW_SECONDS = 60
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_tasks = OrderedDict()  # session_id -> latest PrefetchTask (older ones are cancelled)
+_recent = OrderedDict() # session_id -> deque of prefetch start times in the last minute, least recently active first
+_lock = threading.Lock()
+_in_flight = 0
+_in_flight_lock = threading.Lock() # Separate: cancelling a queued future runs _finish() in the cancelling thread
+
+READ_ONLY_SQL = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+
+
+def _record(outcome):
+    inc_counter("ecom_prefetch_total", labels={"outcome": outcome}, help_text="Speculative prefetches by outcome.")
+
+
+def question_key(question):
+    """Prefetches are matched to the submitted question on lower-cased, whitespace-collapsed text."""
+    return re.sub(r"\s+", " ", question.strip().lower()).rstrip("?.! ")
+
+
+class PrefetchTask:
+    """One speculative SQL generation + query for a partial question. Cancelling interrupts its SQLite query."""
+
+    def __init__(self, key, context_sql):
+        self.key = key
+        self.context_sql = context_sql # Previous SQL the prefetch was generated against
+        self.created_at = time.time()
+        self.cancelled = threading.Event()
+        self.future = None
+        self.sql = None
+        self.data_frame = None
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel() # No-op if it already started
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def run(self, generate_sql, open_connection):
+        if self.cancelled.is_set():
+            return
+        sql_query = generate_sql()
+        if self.cancelled.is_set() or sql_query.startswith("-- ERROR:"):
+            return
+        self.sql = sql_query
+        # Only read-only queries are executed speculatively
+        if not READ_ONLY_SQL.match(sql_query):
+            return
+
+        with open_connection() as conn:
+            with self._conn_lock:
+                if self.cancelled.is_set():
+                    return
+                self._conn = conn
+            try:
+                df = pd.read_sql_query(sql_query, conn)
+            except Exception:
+                return # Interrupted or invalid; a real submit reports the error itself
+            finally:
+                with self._conn_lock:
+                    self._conn = None
+        if not self.cancelled.is_set() and len(df) <= PREFETCH_MAX_ROWS:
+            self.data_frame = df
+
+
+def _finish(future):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+def _prune_recent_locked(now):
+    """Caller holds _lock. Forgets sessions with no prefetch in the last window, and the least active beyond the cap."""
+    while _recent:
+        session_id, times = next(iter(_recent.items()))
+        if times and now - times[-1] <= RATE_WINDOW_SECONDS and len(_recent) <= PREFETCH_MAX_SESSIONS:
+            break
+        del _recent[session_id]
+
+
+def _is_fresh(task):
+    return time.time() - task.created_at <= PREFETCH_TTL_SECONDS
+
+
+def schedule_prefetch(session_id, question, context_sql, generate_sql, open_connection):
+    """
+    Starts a background prefetch for a partial question, superseding the session's previous one.
+    'generate_sql' is a zero-argument callable returning SQL and 'open_connection' one returning a
+    connection context manager (e.g. the tenant's pooled connection). Returns a status string:
+    scheduled, duplicate, too_short, rate_limited, busy or disabled.
+    """
+    global _in_flight
+    if not PREFETCH_ENABLED:
+        return "disabled"
+    key = question_key(question)
+    if len(key) < PREFETCH_MIN_CHARS:
+        return "too_short"
+
+    now = time.time()
+    with _lock:
+        current = _tasks.get(session_id)
+        if current is not None and current.key == key and current.context_sql == context_sql \
+                and not current.cancelled.is_set() and _is_fresh(current):
+            return "duplicate"
+
+        _prune_recent_locked(now)
+        recent = _recent.setdefault(session_id, deque())
+        while recent and now - recent[0] > RATE_WINDOW_SECONDS:
+            recent.popleft()
+        if len(recent) >= PREFETCH_MAX_PER_MINUTE:
+            _record("rate_limited")
+            return "rate_limited"
+        with _in_flight_lock:
+            if _in_flight >= PREFETCH_MAX_IN_FLIGHT:
+                _record("busy")
+                return "busy"
+            _in_flight += 1
+
+        if current is not None:
+            current.cancel()
+            _record("superseded")
+        task = PrefetchTask(key, context_sql)
+        _tasks[session_id] = task
+        _tasks.move_to_end(session_id)
+        while len(_tasks) > PREFETCH_MAX_SESSIONS:
+            _, old_task = _tasks.popitem(last=False)
+            old_task.cancel()
+        recent.append(now)
+        _recent.move_to_end(session_id)
+        task.future = _executor.submit(task.run, generate_sql, open_connection)
+        task.future.add_done_callback(_finish)
+
+    _record("scheduled")
+    return "scheduled"
+
+
+def take_prefetched_sql(session_id, question, context_sql, wait_seconds=PREFETCH_WAIT_SECONDS):
+    """
+    On submit: returns the prefetched SQL if the session's prefetch was for this question (and the
+    same previous SQL), waiting for it to finish if still running. Any other prefetch is cancelled.
+    Returns None when there is nothing usable.
+    """
+    if not session_id:
+        return None
+    with _lock:
+        task = _tasks.get(session_id)
+        if task is None:
+            return None
+        if task.key != question_key(question) or task.context_sql != context_sql or not _is_fresh(task):
+            task.cancel()
+            del _tasks[session_id]
+            _record("missed")
+            return None
+
+    try:
+        task.future.result(timeout=wait_seconds)
+    except FutureTimeoutError:
+        return None # Too slow; let the submit generate SQL itself, the prefetch may still warm the rows
+    except Exception:
+        with _lock:
+            if _tasks.get(session_id) is task:
+                del _tasks[session_id]
+        return None
+
+    if task.sql is None:
+        return None
+    _record("hit")
+    return task.sql
+
+
+def pop_prefetched_rows(session_id, sql_query):
+    """Returns (and forgets) the prefetched result frame for this exact SQL, or None."""
+    if not session_id:
+        return None
+    with _lock:
+        task = _tasks.get(session_id)
+        if task is None or task.sql != sql_query or task.data_frame is None or not _is_fresh(task):
+            return None
+        del _tasks[session_id]
+    return task.data_frame
@@ -0,0 +1,115 @@
+# utils/profiling.py
+
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+# --- Configuration ---
+# Profiling is off unless explicitly enabled; a request then opts in with
+# the 'X-Profile: 1' header or the '?profile=1' query flag.
+PROFILING_ENABLED = os.getenv("ENABLE_PROFILING", "false").lower() == "true"
+PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles") # Relative to project root
+TOP_ALLOCATIONS = 25
+
+# tracemalloc is process-wide, so only one request is profiled at a time.
+_profile_lock = threading.Lock()
+
+
+def profiling_requested(request):
+    """Returns True if profiling is enabled in config and the request asked for it."""
+    if not PROFILING_ENABLED:
+        return False
+    flag = request.headers.get("X-Profile") or request.args.get("profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+
+def start_profile():
+    """
+    Starts cProfile and tracemalloc for the current request.
+    Returns a state dict for finish_profile(), or None if another request is already being profiled.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        print("[Profiling]: Another request is being profiled, skipping this one.")
+        return None
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    profiler = cProfile.Profile()
+    state = {
+        "profiler": profiler,
+        "started_tracemalloc": started_tracemalloc,
+        "start": time.perf_counter(),
+    }
+    profiler.enable()
+    return state
+
+
+def stop_profile(state):
+    """Stops cProfile and tracemalloc so that writing the profile is not itself measured."""
+    state["profiler"].disable()
+    state["duration"] = time.perf_counter() - state["start"]
+    state["snapshot"] = tracemalloc.take_snapshot()
+    _, state["peak_bytes"] = tracemalloc.get_traced_memory()
+    if state["started_tracemalloc"]:
+        tracemalloc.stop()
+
+
+def finish_profile(state, endpoint, question=None, sql=None, status_code=None):
+    """Writes '<id>.prof' and '<id>.json' to PROFILES_DIR for a stopped profile and returns the profile id."""
+    try:
+        duration = state["duration"]
+        snapshot = state["snapshot"]
+        peak_bytes = state["peak_bytes"]
+
+        top_allocations = []
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            top_allocations.append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_bytes": stat.size,
+                "count": stat.count,
+            })
+
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        profile_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "_" + uuid.uuid4().hex[:8]
+        prof_path = os.path.join(PROFILES_DIR, f"{profile_id}.prof")
+        state["profiler"].dump_stats(prof_path)
+
+        metadata = {
+            "profile_id": profile_id,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "endpoint": endpoint,
+            "status_code": status_code,
+            "question": question,
+            "sql": sql,
+            "duration_ms": round(duration * 1000, 3),
+            "peak_memory_bytes": peak_bytes,
+            "profile_file": os.path.basename(prof_path),
+            "top_allocations": top_allocations,
+        }
+        with open(os.path.join(PROFILES_DIR, f"{profile_id}.json"), "w") as f:
+            json.dump(metadata, f, indent=2)
+
+        print(f"[Profiling]: Wrote profile '{profile_id}' for {endpoint} ({metadata['duration_ms']} ms).")
+        return profile_id
+    finally:
+        state["finished"] = True
+        _profile_lock.release()
+
+
+def discard_profile(state):
+    """Releases a profile that never reached finish_profile() (e.g. the request raised)."""
+    if state.get("finished"):
+        return
+    if "snapshot" not in state:
+        stop_profile(state)
+    state["finished"] = True
+    _profile_lock.release()
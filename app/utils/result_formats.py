@@ -0,0 +1,103 @@
+# utils/result_formats.py
+
+import io
+import os
+from urllib.parse import quote
+
+from flask import Response
+
+try:
+    import pyarrow as pa # Optional: only needed for Arrow IPC output
+except ImportError:
+    pa = None
+
+# --- Configuration ---
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "10000")) # Rows serialized per streamed CSV chunk
+
+# format= value -> media type used for Accept negotiation (first entry wins for '*/*')
+FORMAT_MIMETYPES = {
+    "records": "application/json",
+    "columnar": "application/vnd.ecom.columnar+json",
+    "html": "text/html",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+FORMAT_ALIASES = {"json": "records", "rows": "records", "columns": "columnar", "ipc": "arrow"}
+
+
+def negotiate_format(request):
+    """
+    Picks the result format for a request: 'format' (query string or JSON body) wins over
+    the Accept header. Returns a key of FORMAT_MIMETYPES, or None if nothing requested is supported.
+    """
+    requested = request.args.get("format") or (request.get_json(silent=True) or {}).get("format")
+    if requested:
+        requested = FORMAT_ALIASES.get(requested.lower(), requested.lower())
+        return requested if requested in FORMAT_MIMETYPES else None
+
+    if not request.accept_mimetypes:
+        return "records"
+    best = request.accept_mimetypes.best_match(list(FORMAT_MIMETYPES.values()))
+    if best is None:
+        return None
+    return next(name for name, mimetype in FORMAT_MIMETYPES.items() if mimetype == best)
+
+
+def format_unavailable_reason(result_format):
+    """Returns an error message if the format cannot be produced in this environment, else None."""
+    if result_format is None:
+        return f"Unsupported result format. Use format= or Accept with one of: {', '.join(FORMAT_MIMETYPES)}."
+    if result_format == "arrow" and pa is None:
+        return "Arrow IPC output requires the 'pyarrow' package."
+    return None
+
+
+def columnar_payload(df):
+    """{"columns": [...], "data": {column: [values]}, "row_count": n}, the same shape /api/kpis returns."""
+    return {
+        "columns": [str(col) for col in df.columns],
+        "data": df.to_dict(orient="list"),
+        "row_count": len(df),
+    }
+
+
+def rows_payload(df, result_format):
+    """Result rows for JSON responses: column-oriented for 'columnar', row records otherwise."""
+    if result_format == "columnar":
+        return columnar_payload(df)
+    return df.to_dict(orient="records")
+
+
+def metadata_headers(metadata):
+    # Header values must be latin-1, so free text (SQL, answers) is percent-encoded
+    return {f"X-{name.replace('_', '-').title()}": quote(str(value)) for name, value in metadata.items() if value is not None}
+
+
+def csv_response(df, metadata=None):
+    """Streams the frame as CSV in CSV_CHUNK_ROWS-row chunks instead of building one large string."""
+    def generate():
+        yield df.head(0).to_csv(index=False)
+        for start in range(0, len(df), CSV_CHUNK_ROWS):
+            yield df.iloc[start:start + CSV_CHUNK_ROWS].to_csv(index=False, header=False)
+
+    return Response(generate(), mimetype=FORMAT_MIMETYPES["csv"], headers=metadata_headers(metadata or {}))
+
+
+def arrow_response(df, metadata=None):
+    """Arrow IPC stream of the frame; metadata is also attached to the Arrow schema."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata.update({name.encode(): str(value).encode() for name, value in metadata.items() if value is not None})
+        table = table.replace_schema_metadata(schema_metadata)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue(), mimetype=FORMAT_MIMETYPES["arrow"], headers=metadata_headers(metadata or {}))
+
+
+def file_response(df, result_format, metadata=None):
+    """CSV or Arrow response for the frame; metadata (sql, question, ...) travels in X-* headers."""
+    if result_format == "csv":
+        return csv_response(df, metadata)
+    return arrow_response(df, metadata)
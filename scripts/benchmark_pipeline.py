@@ -0,0 +1,212 @@
+# benchmark_pipeline.py
+#
+# Offline end-to-end benchmark of the question-answering pipeline:
+#   question_to_sql -> run_sql_query_helper -> generate_chart -> humanize_answer
+# Gemini is replaced by the deterministic stub backend (app/models/stub_models.py),
+# so runs are reproducible and need no API key.
+#
+#   python scripts/benchmark_pipeline.py --iterations 20 --llm-latency-ms 300
+#   python scripts/benchmark_pipeline.py --compare bench_results/baseline.json
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ["sql_generation", "sql_execution", "chart_building", "humanization", "total"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the question -> SQL -> chart -> answer pipeline with a stub LLM.")
+    parser.add_argument("--iterations", type=int, default=10, help="Passes over the question corpus")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed warm-up passes")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency per stub LLM call")
+    parser.add_argument("--corpus", help="Optional JSON file with a list of questions (defaults to the stub corpus)")
+    parser.add_argument("--output", help="Where to save results (default: bench_results/pipeline_<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent for --compare")
+    return parser.parse_args()
+
+
+def setup_pipeline(llm_latency_ms):
+    # The stub backend must be selected before the models module is imported.
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["STUB_LLM_LATENCY_MS"] = str(llm_latency_ms)
+    os.chdir(PROJECT_ROOT) # DB and schema paths are relative to the project root
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "app"))
+
+    import main
+    from llm.gemini_agent import question_to_sql, humanize_answer
+    from utils.charts import generate_chart
+    return question_to_sql, main.run_sql_query_helper, generate_chart, humanize_answer
+
+
+def load_questions(corpus_path):
+    if corpus_path:
+        with open(corpus_path) as f:
+            return json.load(f)
+    from models.stub_corpus import STUB_CORPUS
+    return [entry["question"] for entry in STUB_CORPUS]
+
+
+def run_question(pipeline, question):
+    """Runs one question through every stage the way /api/ask does; returns stage timings in ms."""
+    question_to_sql, run_sql_query_helper, generate_chart, humanize_answer = pipeline
+    timings = {}
+    start = time.perf_counter()
+
+    t = time.perf_counter()
+    sql_query = question_to_sql(question)
+    timings["sql_generation"] = (time.perf_counter() - t) * 1000
+    if sql_query.startswith("-- ERROR:"):
+        raise RuntimeError(sql_query)
+
+    t = time.perf_counter()
+    result = run_sql_query_helper(sql_query)
+    timings["sql_execution"] = (time.perf_counter() - t) * 1000
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    result_df = result["data_frame"]
+
+    if not result_df.empty:
+        t = time.perf_counter()
+        generate_chart(result_df, question)
+        timings["chart_building"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    humanize_answer(question, sql_query, result_df)
+    timings["humanization"] = (time.perf_counter() - t) * 1000
+
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError: # Not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024 # Linux reports KiB
+
+
+def run_benchmark(args):
+    pipeline = setup_pipeline(args.llm_latency_ms)
+    from utils.metrics import summarize_latencies
+    questions = load_questions(args.corpus)
+
+    for _ in range(args.warmup):
+        for question in questions:
+            run_question(pipeline, question)
+
+    samples = {stage: [] for stage in STAGES}
+    errors = []
+    wall_start = time.perf_counter()
+    for _ in range(args.iterations):
+        for question in questions:
+            try:
+                timings = run_question(pipeline, question)
+            except Exception as e:
+                errors.append({"question": question, "error": str(e)})
+                continue
+            for stage, value in timings.items():
+                samples[stage].append(value)
+    wall_seconds = time.perf_counter() - wall_start
+
+    # Separate pass for Python allocations so tracemalloc overhead does not skew the timings above.
+    tracemalloc.start()
+    for question in questions:
+        try:
+            run_question(pipeline, question)
+        except Exception:
+            pass
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    completed = len(samples["total"])
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "llm_latency_ms": args.llm_latency_ms,
+            "questions": len(questions),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "stages": {stage: summarize_latencies(values) for stage, values in samples.items()},
+        "throughput_qps": round(completed / wall_seconds, 3) if wall_seconds > 0 else None,
+        "completed": completed,
+        "errors": errors,
+        "peak_memory": {
+            "traced_python_bytes": peak_traced,
+            "process_rss_bytes": peak_rss_bytes(),
+        },
+    }
+
+
+def print_report(results):
+    print(f"\n📊 Pipeline benchmark ({results['completed']} questions, "
+          f"stub LLM latency {results['config']['llm_latency_ms']} ms)")
+    print(f"{'stage':<16}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}{'mean_ms':>10}{'count':>8}")
+    for stage in STAGES:
+        s = results["stages"].get(stage, {})
+        if not s.get("count"):
+            continue
+        print(f"{stage:<16}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['mean_ms']:>10.2f}{s['count']:>8}")
+    print(f"\n🚀 Throughput: {results['throughput_qps']} questions/s")
+    mem = results["peak_memory"]
+    print(f"🧮 Peak traced Python memory: {mem['traced_python_bytes'] / 1024 / 1024:.2f} MiB")
+    if mem["process_rss_bytes"]:
+        print(f"🧮 Peak process RSS: {mem['process_rss_bytes'] / 1024 / 1024:.2f} MiB")
+    if results["errors"]:
+        print(f"⚠️ {len(results['errors'])} question(s) failed, e.g. {results['errors'][0]}")
+
+
+def compare_results(results, baseline, threshold_pct):
+    """Prints per-stage deltas against a baseline run; returns True if any p50/p95 regressed past the threshold."""
+    print(f"\n🔍 Comparison against baseline recorded at {baseline.get('recorded_at')}:")
+    regressed = False
+    for stage in STAGES:
+        current, previous = results["stages"].get(stage, {}), baseline.get("stages", {}).get(stage, {})
+        for key in ("p50_ms", "p95_ms"):
+            if not current.get(key) or not previous.get(key):
+                continue
+            delta_pct = (current[key] - previous[key]) * 100.0 / previous[key]
+            flag = ""
+            if delta_pct > threshold_pct:
+                flag = "  ❌ REGRESSION"
+                regressed = True
+            print(f"  {stage:<16}{key:<8}{previous[key]:>10.2f} -> {current[key]:>10.2f} ({delta_pct:+.1f}%){flag}")
+    if baseline.get("throughput_qps") and results.get("throughput_qps"):
+        delta_pct = (results["throughput_qps"] - baseline["throughput_qps"]) * 100.0 / baseline["throughput_qps"]
+        print(f"  throughput: {baseline['throughput_qps']} -> {results['throughput_qps']} qps ({delta_pct:+.1f}%)")
+    return regressed
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Resolve user-supplied paths before setup_pipeline() switches to the project root.
+    for name in ("corpus", "output", "compare"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    results = run_benchmark(args)
+    print_report(results)
+
+    output_path = args.output or os.path.join(
+        PROJECT_ROOT, "bench_results", f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results saved to {output_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_results(results, baseline, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,95 @@
+# check_tenant_isolation.py
+#
+# Regression check for multi-tenant routing (app/db/tenants.py). Two throwaway tenants are
+# provisioned in a temporary TENANTS_DIR, then SQL that tries to reach outside the caller's
+# tenant (ATTACH, VACUUM INTO, PRAGMA writes, DDL) is sent to /api/execute_query. Pooled
+# connections are reused, so follow-up requests on the same tenant must not see any of it.
+#
+#   python scripts/check_tenant_isolation.py
+#
+# Exits with status 1 if any check fails.
+
+import os
+import shutil
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_app(tenants_dir):
+    # Configuration is read at import time, so set it before importing the app.
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["TENANTS_DIR"] = tenants_dir
+    os.chdir(PROJECT_ROOT) # DB and schema paths are relative to the project root
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "app"))
+
+    import main
+    return main.app.test_client()
+
+
+def provision(tenants_dir, tenant_id):
+    data_dir = os.path.join(tenants_dir, tenant_id, "data")
+    os.makedirs(data_dir)
+    for name in ("eligibility.csv", "ad_sales.csv", "total_sales.csv"):
+        shutil.copy(os.path.join(PROJECT_ROOT, "app", "data", name), data_dir)
+    return os.path.join(tenants_dir, tenant_id, "ecom.db")
+
+
+def run_checks(client, tenants_dir):
+    victim_db = provision(tenants_dir, "victim")
+    provision(tenants_dir, "acme")
+    ghost_db = os.path.join(tenants_dir, "ghost", "ecom.db") # Not provisioned yet
+    os.makedirs(os.path.dirname(ghost_db))
+
+    def query(sql, tenant_id="acme"):
+        response = client.post("/api/execute_query", json={"sql": sql, "question": "isolation check"},
+                                headers={"X-Tenant-Id": tenant_id})
+        return response.status_code, response.get_json()
+
+    # Provision victim before acme tries to reach it
+    status, _ = query("SELECT 1 AS ok;", "victim")
+    results = [("victim tenant provisioned", status == 200 and os.path.exists(victim_db))]
+
+    attacks = {
+        "ATTACH another tenant's database": f"ATTACH DATABASE '{victim_db}' AS v;",
+        "ATTACH an unprovisioned tenant's path": f"ATTACH DATABASE '{ghost_db}' AS g;",
+        "VACUUM INTO an unprovisioned tenant's path": f"VACUUM INTO '{ghost_db}';",
+        "PRAGMA assignment": "PRAGMA user_version = 7;",
+        "DDL": "CREATE TABLE injected (x);",
+        "DML": "DELETE FROM ad_sales_metrics;",
+    }
+    for name, sql in attacks.items():
+        status, _ = query(sql)
+        results.append((f"{name} is refused", status != 200))
+
+    results.append(("no file created for the unprovisioned tenant", not os.path.exists(ghost_db)))
+
+    # The same tenant's next requests reuse the pooled handle and must see only its own database
+    status, body = query("SELECT name, file FROM pragma_database_list;")
+    schemas = [row["name"] for row in body.get("raw_results_records", [])] if status == 200 else None
+    results.append(("next request sees only the main schema", schemas == ["main"]))
+    status, _ = query("SELECT COUNT(*) AS n FROM v.ad_sales_metrics;")
+    results.append(("next request cannot read the attached schema", status != 200))
+    status, body = query("SELECT COUNT(*) AS n FROM ad_sales_metrics;")
+    results.append(("own data is still readable and intact",
+                     status == 200 and body["raw_results_records"][0]["n"] > 0))
+    return results
+
+
+if __name__ == "__main__":
+    tenants_dir = tempfile.mkdtemp(prefix="tenant_isolation_")
+    try:
+        client = setup_app(tenants_dir)
+        results = run_checks(client, tenants_dir)
+    finally:
+        shutil.rmtree(tenants_dir, ignore_errors=True)
+
+    print()
+    for name, passed in results:
+        print(f"{'✅' if passed else '❌'} {name}")
+    failed = [name for name, passed in results if not passed]
+    if failed:
+        print(f"\n❌ {len(failed)} isolation check(s) failed.")
+        sys.exit(1)
+    print(f"\n✅ All {len(results)} isolation checks passed.")
@@ -0,0 +1,315 @@
+# load_test.py
+#
+# HTTP load generator for the Flask endpoints. Each virtual user is one browser tab
+# (one session_id) and either walks the progressive UI flow in the same order as main.js
+#   /api/prefetch (while "typing") -> /api/generate_sql -> /api/execute_query (format=html)
+#   -> /api/generate_chart -> /api/humanize_answer
+# optionally followed by a follow-up refinement ("top 3") in the same session,
+# or calls the combined /api/ask endpoint, for a range of concurrency levels.
+#
+# Run the app against the stub LLM so results measure this server, not Gemini:
+#   LLM_BACKEND=stub STUB_LLM_LATENCY_MS=300 python app/main.py
+#   python scripts/load_test.py --concurrency 1,4,8,16 --duration 30 --ramp-up 5
+# or let the script start a stub-backed server itself:
+#   python scripts/load_test.py --start-server --llm-latency-ms 300
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "app"))
+
+from models.stub_corpus import STUB_CORPUS
+from utils.metrics import summarize_latencies
+
+UI_FLOW = ["/api/generate_sql", "/api/execute_query", "/api/generate_chart", "/api/humanize_answer"]
+ASK_ENDPOINT = "/api/ask"
+PREFETCH_ENDPOINT = "/api/prefetch"
+PREFETCH_MIN_CHARS = 12 # main.js does not prefetch shorter questions
+# Refinements the follow-up planner answers from the previous result
+FOLLOWUP_QUESTIONS = ["top 3", "top 5", "first 10", "bottom 3"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the E-commerce AI Agent HTTP endpoints.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000", help="Server to test (default: %(default)s)")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated virtual user counts to step through")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to hold each concurrency level")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Seconds over which users of a level are started")
+    parser.add_argument("--ask-ratio", type=float, default=0.2, help="Fraction of sessions using /api/ask instead of the UI flow")
+    parser.add_argument("--followup-ratio", type=float, default=0.2, help="Fraction of UI flows followed by a follow-up question")
+    parser.add_argument("--typing-seconds", type=float, default=1.0,
+                        help="Time between the first prefetch and submit, like a user finishing the question")
+    parser.add_argument("--no-prefetch", action="store_true", help="Skip /api/prefetch calls (UI flow without typing)")
+    parser.add_argument("--questions", help="JSON file with a list of questions, or of {question, weight} objects")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the question/flow mix")
+    parser.add_argument("--output", help="Save results JSON here")
+    parser.add_argument("--start-server", action="store_true", help="Start a stub-LLM server on --base-url's port")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Stub LLM latency when using --start-server")
+    return parser.parse_args()
+
+
+def load_question_mix(path):
+    """Returns (questions, weights). Defaults to the stub corpus with equal weights."""
+    if not path:
+        return [entry["question"] for entry in STUB_CORPUS], None
+    with open(path) as f:
+        entries = json.load(f)
+    questions = [e["question"] if isinstance(e, dict) else e for e in entries]
+    weights = [e.get("weight", 1.0) if isinstance(e, dict) else 1.0 for e in entries]
+    return questions, weights
+
+
+def post_json(base_url, path, payload, timeout):
+    """POSTs JSON and returns (ok, status, body, latency_ms)."""
+    data = json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(base_url + path, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = json.loads(resp.read())
+            return True, resp.status, body, (time.perf_counter() - start) * 1000
+    except urllib.error.HTTPError as e:
+        return False, e.code, None, (time.perf_counter() - start) * 1000
+    except Exception:
+        return False, None, None, (time.perf_counter() - start) * 1000
+
+
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}  # endpoint -> [ms]
+        self.requests = {}   # endpoint -> count
+        self.errors = {}     # endpoint -> count
+        self.flows_completed = 0
+        self.flows_failed = 0
+
+    def record(self, endpoint, ok, latency_ms):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(latency_ms)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def record_flow(self, ok):
+        with self.lock:
+            if ok:
+                self.flows_completed += 1
+            else:
+                self.flows_failed += 1
+
+
+def simulate_typing(args, stats, session_id, question):
+    """Debounced prefetches main.js sends while the question is typed: a partial question, then the full one."""
+    partial = question[:max(len(question) * 2 // 3, 1)]
+    for text in (partial, question):
+        if len(text.strip()) >= PREFETCH_MIN_CHARS:
+            ok, _, _, ms = post_json(args.base_url, PREFETCH_ENDPOINT, {"question": text, "session_id": session_id}, args.timeout)
+            stats.record(PREFETCH_ENDPOINT, ok, ms) # Best effort, like main.js; never fails the flow
+        time.sleep(args.typing_seconds / 2)
+
+
+def run_ui_flow(args, stats, session_id, question):
+    """Mirrors the sequential fetch() calls in main.js; stops at the first failing stage."""
+    if not args.no_prefetch:
+        simulate_typing(args, stats, session_id, question)
+
+    ok, _, sql_data, ms = post_json(args.base_url, UI_FLOW[0], {"question": question, "session_id": session_id}, args.timeout)
+    stats.record(UI_FLOW[0], ok, ms)
+    if not ok:
+        return False
+    sql = sql_data["sql"]
+
+    payload = {"sql": sql, "question": question, "session_id": session_id, "format": "html"}
+    ok, _, query_data, ms = post_json(args.base_url, UI_FLOW[1], payload, args.timeout)
+    stats.record(UI_FLOW[1], ok, ms)
+    if not ok:
+        return False
+    records = query_data["raw_results_records"]
+
+    for path in UI_FLOW[2:]:
+        payload = {"raw_results_records": records, "sql": sql, "question": question}
+        ok, _, _, ms = post_json(args.base_url, path, payload, args.timeout)
+        stats.record(path, ok, ms)
+        if not ok:
+            return False
+    return True
+
+
+def run_ask_flow(args, stats, session_id, question):
+    ok, _, _, ms = post_json(args.base_url, ASK_ENDPOINT, {"question": question, "session_id": session_id}, args.timeout)
+    stats.record(ASK_ENDPOINT, ok, ms)
+    return ok
+
+
+def virtual_user(args, stats, stop_event, rng, questions, weights):
+    session_id = str(uuid.UUID(int=rng.getrandbits(128))) # One tab per virtual user, like main.js's sessionStorage id
+    while not stop_event.is_set():
+        question = rng.choices(questions, weights=weights)[0]
+        if rng.random() < args.ask_ratio:
+            ok = run_ask_flow(args, stats, session_id, question)
+        else:
+            ok = run_ui_flow(args, stats, session_id, question)
+            if ok and rng.random() < args.followup_ratio and not stop_event.is_set():
+                stats.record_flow(ok)
+                ok = run_ui_flow(args, stats, session_id, rng.choice(FOLLOWUP_QUESTIONS))
+        stats.record_flow(ok)
+
+
+def run_level(args, users, questions, weights):
+    """Ramps up to 'users' virtual users, holds for --duration, and returns this level's summary."""
+    stats = LoadStats()
+    stop_event = threading.Event()
+    threads = []
+    ramp_step = args.ramp_up / users if users > 0 else 0
+
+    for i in range(users):
+        rng = random.Random(args.seed * 1000 + users * 100 + i)
+        t = threading.Thread(target=virtual_user, args=(args, stats, stop_event, rng, questions, weights), daemon=True)
+        t.start()
+        threads.append(t)
+        if ramp_step:
+            time.sleep(ramp_step)
+
+    # Measure only the steady-state window after ramp-up.
+    with stats.lock:
+        stats.latencies.clear()
+        stats.requests.clear()
+        stats.errors.clear()
+        stats.flows_completed = stats.flows_failed = 0
+    window_start = time.perf_counter()
+    time.sleep(args.duration)
+    with stats.lock:
+        window = time.perf_counter() - window_start
+        snapshot = {
+            "latencies": {k: list(v) for k, v in stats.latencies.items()},
+            "requests": dict(stats.requests),
+            "errors": dict(stats.errors),
+            "flows_completed": stats.flows_completed,
+            "flows_failed": stats.flows_failed,
+        }
+    stop_event.set()
+    for t in threads:
+        t.join(timeout=args.timeout)
+
+    endpoints = {}
+    for endpoint in [PREFETCH_ENDPOINT] + UI_FLOW + [ASK_ENDPOINT]:
+        total = snapshot["requests"].get(endpoint, 0)
+        if not total:
+            continue
+        errors = snapshot["errors"].get(endpoint, 0)
+        endpoints[endpoint] = {
+            "requests": total,
+            "throughput_rps": round(total / window, 3),
+            "error_rate": round(errors / total, 4),
+            "latency": summarize_latencies(snapshot["latencies"].get(endpoint, [])),
+        }
+
+    total_requests = sum(snapshot["requests"].values())
+    return {
+        "users": users,
+        "window_seconds": round(window, 3),
+        "flows_completed": snapshot["flows_completed"],
+        "flows_failed": snapshot["flows_failed"],
+        "flows_per_second": round(snapshot["flows_completed"] / window, 3),
+        "requests_per_second": round(total_requests / window, 3),
+        "error_rate": round(sum(snapshot["errors"].values()) / total_requests, 4) if total_requests else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def find_saturation(levels):
+    """
+    Saturation is the first level after which adding users gains <10% flow throughput;
+    beyond it extra users only add queueing latency.
+    """
+    if not levels:
+        return None
+    best = max(levels, key=lambda l: l["flows_per_second"])
+    for prev, cur in zip(levels, levels[1:]):
+        if prev["flows_per_second"] > 0 and cur["flows_per_second"] < prev["flows_per_second"] * 1.10:
+            return {"users": prev["users"], "flows_per_second": prev["flows_per_second"],
+                    "peak_flows_per_second": best["flows_per_second"], "peak_users": best["users"]}
+    return {"users": best["users"], "flows_per_second": best["flows_per_second"],
+            "peak_flows_per_second": best["flows_per_second"], "peak_users": best["users"],
+            "note": "Throughput still scaling at the highest level tested."}
+
+
+def print_level(level):
+    print(f"\n👥 {level['users']} users: {level['flows_per_second']} flows/s, "
+          f"{level['requests_per_second']} req/s, error rate {level['error_rate'] * 100:.2f}%")
+    print(f"  {'endpoint':<24}{'req/s':>9}{'err%':>8}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}")
+    for endpoint, s in level["endpoints"].items():
+        lat = s["latency"]
+        if lat.get("count"):
+            print(f"  {endpoint:<24}{s['throughput_rps']:>9.2f}{s['error_rate'] * 100:>8.2f}"
+                  f"{lat['p50_ms']:>10.1f}{lat['p95_ms']:>10.1f}{lat['p99_ms']:>10.1f}")
+        else:
+            print(f"  {endpoint:<24}{s['throughput_rps']:>9.2f}{s['error_rate'] * 100:>8.2f}{'-':>10}{'-':>10}{'-':>10}")
+
+
+def start_stub_server(base_url, llm_latency_ms):
+    """Starts the Flask app (threaded, no reloader) with the stub LLM backend and waits until it answers."""
+    port = int(base_url.rsplit(":", 1)[1].split("/")[0])
+    env = dict(os.environ, LLM_BACKEND="stub", STUB_LLM_LATENCY_MS=str(llm_latency_ms))
+    code = ("import sys; sys.path.insert(0, 'app'); import main; "
+            f"main.app.run(port={port}, threaded=True, debug=False, use_reloader=False)")
+    server = subprocess.Popen([sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(base_url + "/metrics", timeout=1).close()
+            return server
+        except Exception:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Stub server did not come up on {base_url}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    questions, weights = load_question_mix(args.questions)
+    levels_to_run = [int(x) for x in args.concurrency.split(",") if x.strip()]
+
+    server = start_stub_server(args.base_url, args.llm_latency_ms) if args.start_server else None
+    try:
+        print(f"🚀 Load testing {args.base_url} with {len(questions)} questions, "
+              f"{args.ask_ratio * 100:.0f}% via {ASK_ENDPOINT}")
+        levels = []
+        for users in levels_to_run:
+            level = run_level(args, users, questions, weights)
+            print_level(level)
+            levels.append(level)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    saturation = find_saturation(levels)
+    if saturation:
+        print(f"\n📈 Saturation at ~{saturation['users']} users ({saturation['flows_per_second']} flows/s); "
+              f"peak {saturation['peak_flows_per_second']} flows/s at {saturation['peak_users']} users.")
+        if saturation.get("note"):
+            print(f"⚠️ {saturation['note']} Try higher --concurrency levels.")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "config": {k: v for k, v in vars(args).items()},
+                "levels": levels,
+                "saturation": saturation,
+            }, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
@@ -0,0 +1,87 @@
+# profile_report.py
+#
+# Summarizes profiles written by the on-demand profiling hook (see app/utils/profiling.py).
+#
+#   python scripts/profile_report.py                    # 10 slowest recorded requests
+#   python scripts/profile_report.py --top 20 --endpoint ask_api
+#   python scripts/profile_report.py --show <profile_id> # hot functions + top allocations
+
+import argparse
+import glob
+import json
+import os
+import pstats
+
+DEFAULT_PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles")
+
+
+def load_profiles(profiles_dir):
+    profiles = []
+    for path in glob.glob(os.path.join(profiles_dir, "*.json")):
+        try:
+            with open(path) as f:
+                profiles.append(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Skipping unreadable profile '{path}': {e}")
+    return profiles
+
+
+def _shorten(text, width):
+    text = " ".join((text or "-").split())
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def print_slowest(profiles, top, endpoint=None):
+    if endpoint:
+        profiles = [p for p in profiles if p.get("endpoint") == endpoint]
+    if not profiles:
+        print("⚠️ No recorded profiles found.")
+        return
+
+    slowest = sorted(profiles, key=lambda p: p.get("duration_ms", 0), reverse=True)[:top]
+    print(f"\n🐢 {len(slowest)} slowest of {len(profiles)} recorded requests:\n")
+    print(f"{'duration_ms':>12}  {'peak_mem_kb':>11}  {'endpoint':<20} {'profile_id':<25} question / sql")
+    for p in slowest:
+        print(f"{p.get('duration_ms', 0):>12.1f}  {p.get('peak_memory_bytes', 0) / 1024:>11.1f}  "
+              f"{_shorten(p.get('endpoint'), 20):<20} {p.get('profile_id', ''):<25} "
+              f"{_shorten(p.get('question'), 60)}")
+        if p.get("sql"):
+            print(f"{'':>74}{_shorten(p['sql'], 80)}")
+
+
+def show_profile(profiles_dir, profile_id, limit):
+    meta_path = os.path.join(profiles_dir, f"{profile_id}.json")
+    if not os.path.exists(meta_path):
+        print(f"❌ Profile '{profile_id}' not found in '{profiles_dir}'.")
+        return
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    print(f"\n📝 Profile {profile_id} ({meta.get('endpoint')}, {meta.get('duration_ms')} ms, "
+          f"peak memory {meta.get('peak_memory_bytes', 0) / 1024:.1f} KiB)")
+    print(f"❓ Question: {meta.get('question')}")
+    print(f"💻 SQL: {meta.get('sql')}")
+
+    print(f"\n⏱️ Top {limit} functions by cumulative time:")
+    stats = pstats.Stats(os.path.join(profiles_dir, meta["profile_file"]))
+    stats.sort_stats("cumulative").print_stats(limit)
+
+    print(f"🧮 Top {limit} allocation sites:")
+    for alloc in meta.get("top_allocations", [])[:limit]:
+        print(f"  {alloc['size_bytes'] / 1024:>10.1f} KiB  {alloc['count']:>7} blocks  {alloc['location']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize recorded request profiles.")
+    parser.add_argument("--dir", default=DEFAULT_PROFILES_DIR, help="Profiles directory (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest requests to list")
+    parser.add_argument("--endpoint", help="Only list profiles for this Flask endpoint (e.g. ask_api)")
+    parser.add_argument("--show", metavar="PROFILE_ID", help="Print hot functions and allocations for one profile")
+    parser.add_argument("--limit", type=int, default=20, help="Rows to print with --show")
+    args = parser.parse_args()
+
+    if args.show:
+        show_profile(args.dir, args.show, args.limit)
+    else:
+        print_slowest(load_profiles(args.dir), args.top, args.endpoint)